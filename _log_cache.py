@@ -0,0 +1,191 @@
+"""
+Per-log SLOT delta extraction with an on-disk cache, shared by the analysis scripts
+"""
+
+import functools
+import hashlib
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from _log_patterns import SLOT_LINE
+
+# Per-log parse results are cached here (relative to the working directory)
+_CACHE_DIR = '.cache'
+
+# Deltas stay within a few thousand mV, so int16 holds them with plenty of
+# headroom at half the size of int32 (cache files and worker results alike)
+DELTA_TYPECODE = 'h'
+_DELTA_MAX = (1 << (8 * array(DELTA_TYPECODE).itemsize - 1)) - 1
+_DELTA_MIN = -_DELTA_MAX - 1
+
+# Bumped whenever the cache file layout changes
+_CACHE_FORMAT = 3
+
+# Failures that only spoil one log (unreadable file); these are reported
+# per file, anything else is a bug and propagates
+LOG_ERRORS = (OSError,)
+
+# Stored in every cache entry; changing the line pattern, storage type or
+# file layout changes it, which invalidates every entry
+_PARSER_ID = int.from_bytes(
+    hashlib.sha1(repr((SLOT_LINE.pattern, DELTA_TYPECODE, _CACHE_FORMAT)).encode()).digest()[:8],
+    'little', signed=True)
+
+def _pack_deltas(values):
+    """Pack deltas into a DELTA_TYPECODE array; returns (array, count dropped as out of range)"""
+    try:
+        return array(DELTA_TYPECODE, values), 0
+    except OverflowError:
+        # A corrupt reading costs only its own sample, not the whole log
+        packed = array(DELTA_TYPECODE, [d for d in values if _DELTA_MIN <= d <= _DELTA_MAX])
+        return packed, len(values) - len(packed)
+
+def _parse_slot_deltas(log_file):
+    """Return (detected_aa, detected_aaa, dropped) for one log.
+
+    The int16 delta arrays are in file order; dropped counts the deltas
+    left out because they don't fit DELTA_TYPECODE.
+    """
+    # One C-level read, then one C-level pass over the bytes
+    matches = SLOT_LINE.findall(Path(log_file).read_bytes())
+    detected_aa, aa_dropped = _pack_deltas([int(d) for aaa_suffix, d in matches if not aaa_suffix])
+    detected_aaa, aaa_dropped = _pack_deltas([int(d) for aaa_suffix, d in matches if aaa_suffix])
+    return detected_aa, detected_aaa, aa_dropped + aaa_dropped
+
+@functools.lru_cache(maxsize=None)
+def _load_slot_deltas(log_file, mtime_ns, size):
+    """Cached _parse_slot_deltas(), checked against the log's mtime and size.
+
+    Each log gets one file under .cache/, named after its path, so a rerun
+    only parses logs that were added or changed since the last one, and a
+    changed log overwrites its entry instead of adding another.
+    """
+    key = hashlib.sha1(os.path.abspath(log_file).encode()).hexdigest()[:16]
+    cache_path = os.path.join(_CACHE_DIR, f"slots_{key}.bin")
+    
+    # Layout: int64 parser id, mtime_ns, size, dropped count and the two
+    # lengths, followed by the two int16 arrays
+    try:
+        with open(cache_path, 'rb') as f:
+            header = array('q')
+            header.fromfile(f, 6)
+            parser_id, cached_mtime_ns, cached_size, dropped, *lengths = header
+            if (parser_id, cached_mtime_ns, cached_size) != (_PARSER_ID, mtime_ns, size):
+                raise EOFError  # Stale entry - parse below and overwrite it
+            deltas = []
+            for length in lengths:
+                values = array(DELTA_TYPECODE)
+                values.fromfile(f, length)
+                deltas.append(values)
+            return (*deltas, dropped)
+    except (OSError, EOFError):
+        pass  # No usable cache - parse below
+    
+    *deltas, dropped = _parse_slot_deltas(log_file)
+    
+    # Best effort: this runs in pool workers, and a missing cache entry only
+    # costs a re-parse next time
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            array('q', [_PARSER_ID, mtime_ns, size, dropped] + [len(values) for values in deltas]).tofile(f)
+            for values in deltas:
+                values.tofile(f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    
+    return (*deltas, dropped)
+
+def slot_deltas(log_file, st=None):
+    """Return (detected_aa, detected_aaa, dropped) for one log, using the per-log cache.
+
+    st is the log's stat result if the caller already has one (from the
+    directory scan), which saves a stat() per file.
+    """
+    if st is None:
+        st = os.stat(log_file)
+    if st.st_size == 0:
+        return array(DELTA_TYPECODE), array(DELTA_TYPECODE), 0  # Nothing to extract, skip the cache lookup
+    return _load_slot_deltas(log_file, st.st_mtime_ns, st.st_size)
+
+def map_logs(worker, jobs):
+    """Yield worker(job) for each log job, in job order.
+
+    Files are independent and parsing is CPU-bound, so the jobs fan out
+    across processes; map() keeps results (and so error messages and every
+    appended buffer) in file order, exactly as a serial loop would.
+    """
+    with ProcessPoolExecutor() as ex:
+        yield from ex.map(worker, jobs, chunksize=8)
+
+def scan_test_logs(log_dir):
+    """Return (log_files, jobs) for the .log files directly under log_dir.
+
+    jobs holds a (path, test_type, stat) entry for each AA or AAA test log,
+    classified by filename; 'both' logs are listed in log_files only.
+    """
+    log_files = []
+    jobs = []
+    if os.path.exists(log_dir):
+        with os.scandir(log_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.log'):
+                    log_files.append(entry.path)
+                    # Classify by filename before anything is opened or
+                    # stat'ed; 'both' files are skipped outright
+                    if 'aa_' in entry.name:
+                        test_type = 'aa'
+                    elif 'aaa_' in entry.name:
+                        test_type = 'aaa'
+                    else:
+                        continue
+                    # DirEntry caches its stat, so workers needn't stat again
+                    jobs.append((entry.path, test_type, entry.stat()))
+    return log_files, jobs
+
+def split_test_deltas(job):
+    """Parse one (path, test_type, stat) log file in a worker process.
+
+    Returns (correct, misdetected, message): the deltas detected as the
+    expected type, the rest, and a message to print or None. The message
+    reports an unreadable file (both series are then empty) or deltas
+    dropped as out of range.
+    """
+    log_file, test_type, st = job
+    try:
+        detected_aa, detected_aaa, dropped = slot_deltas(log_file, st)
+    except LOG_ERRORS as e:
+        return [], [], f"Error processing {log_file}: {e}"
+    message = None
+    if dropped:
+        message = f"Warning: skipped {dropped} out-of-range deltas in {log_file}"
+    
+    # AA battery tests should read around 0mV, AAA tests around 300mV
+    if test_type == 'aa':
+        return detected_aa, detected_aaa, message
+    return detected_aaa, detected_aa, message
+
+def load_test_deltas(jobs):
+    """Return (aa_correct, aa_misdetected, aaa_correct, aaa_failed) for scan_test_logs() jobs.
+
+    Errors and dropped-delta warnings are printed per file, in file order;
+    an unreadable file contributes nothing.
+    """
+    deltas = tuple(array(DELTA_TYPECODE) for _ in range(4))
+    aa_correct, aa_misdetected, aaa_correct, aaa_failed = deltas
+    
+    for (_, test_type, _), (right, missed, message) in zip(jobs, map_logs(split_test_deltas, jobs)):
+        if message:
+            print(message)
+        if test_type == 'aa':
+            aa_correct.extend(right)
+            aa_misdetected.extend(missed)
+        else:
+            aaa_correct.extend(right)
+            aaa_failed.extend(missed)
+    
+    return deltas
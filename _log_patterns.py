@@ -0,0 +1,22 @@
+"""
+Compiled log line patterns shared by the analysis scripts
+"""
+
+import re
+import sys
+
+# On 3.11+ every run of whitespace/digits is matched possessively, so a line
+# that fails further along (e.g. space-padded voltages) is rejected without
+# the engine backtracking through each run. The next token can never match
+# what such a run consumed, so the matches are identical either way.
+_P = '+' if sys.version_info >= (3, 11) else ''
+
+# Compiled once as a bytes pattern so files can be scanned straight out of an
+# mmap without decoding them. findall() yields (aaa_suffix, delta) pairs:
+# the detected type is captured only by its trailing 'A', so b'' means
+# KLVR-AA and b'A' means KLVR-AAA and splitting is a plain truth test.
+# The status emoji is matched but not captured.
+SLOT_LINE = re.compile(
+    (r'(?:✅|🚨)\s+{p}SLOT\s+{p}\d+{p}:\s+{p}KLVR-AA(A?)\s+{p}\|\s+{p}AAA_ON=\d+{p}mV\s+{p}\|'
+     r'\s+{p}AAA_OFF=\d+{p}mV\s+{p}\|\s+{p}Δ=\s*{p}(-?\d+{p})mV').format(p=_P).encode()
+)
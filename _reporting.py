@@ -0,0 +1,100 @@
+"""
+Summary statistics and report output shared by the analysis scripts
+"""
+
+import functools
+import io
+import math
+import sys
+from array import array
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+
+# Percentile levels every report prints
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+def buffered_output(func):
+    """Collect everything func prints and emit it with a single stdout write"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buf = io.StringIO()
+        try:
+            with redirect_stdout(buf):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buf.getvalue())
+    return wrapper
+
+def median_sorted(values):
+    """Median of an already-sorted sequence (same result as statistics.median)"""
+    n = len(values)
+    mid = n // 2
+    if n % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
+
+def new_totals():
+    """Running totals for one delta series, filled in while the logs are parsed"""
+    return {'n': 0, 'total': 0, 'sq_total': 0, 'min': None, 'max': None}
+
+def accumulate(stats, values):
+    """Fold one file's deltas into a series' running totals"""
+    if not values:
+        return
+    stats['n'] += len(values)
+    stats['total'] += sum(values)
+    stats['sq_total'] += sum([d * d for d in values])
+    lo, hi = min(values), max(values)
+    stats['min'] = lo if stats['min'] is None else min(stats['min'], lo)
+    stats['max'] = hi if stats['max'] is None else max(stats['max'], hi)
+
+def _series_totals(values):
+    """Running totals for a series that has already been collected"""
+    stats = new_totals()
+    accumulate(stats, values)
+    return stats
+
+def _mean_stdev(stats):
+    """Mean and sample standard deviation from exact integer running totals"""
+    n, total = stats['n'], stats['total']
+    mean = total / n
+    if n < 2:
+        return mean, 0
+    return mean, math.sqrt((n * stats['sq_total'] - total * total) / (n * (n - 1)))
+
+@dataclass
+class DeltaStats:
+    """Summary of one delta series, computed once and passed to every report"""
+    n: int
+    mean: float
+    std: float
+    median: float
+    min: int
+    max: int
+    sorted: array = field(repr=False)  # the series in ascending order
+    percentiles: dict = field(init=False)  # PERCENTILES level -> value
+    
+    def __post_init__(self):
+        self.percentiles = {p: self.percentile(p) for p in PERCENTILES}
+    
+    @classmethod
+    def from_sorted(cls, values, totals=None):
+        """Summarize an ascending, non-empty series.
+
+        totals are the series' running totals if the caller already has them
+        (see accumulate); otherwise they are computed here.
+        """
+        if totals is None:
+            totals = _series_totals(values)
+        mean, std = _mean_stdev(totals)
+        return cls(n=len(values), mean=mean, std=std, median=median_sorted(values),
+                   min=values[0], max=values[-1], sorted=values)
+    
+    def percentile(self, p):
+        """Sample at index floor(p% of n), clamped to the last sample.
+
+        p * n is formed before dividing by 100 so the floor is exact:
+        p / 100 * n can land just below a whole index (29 / 100 * 100 is
+        28.999...) and pick the sample before the intended one.
+        """
+        return self.sorted[min(int(p * self.n / 100), self.n - 1)]
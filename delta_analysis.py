@@ -4,69 +4,23 @@ Delta-Focused Battery Detection Analysis
 Analyzes voltage delta patterns to determine optimal dual range thresholds
 """
 
-import os
-import re
-import statistics
-from collections import defaultdict
+from bisect import bisect_right
 # Analysis without plotting dependencies
 
+from _log_cache import load_test_deltas, scan_test_logs
+from _reporting import buffered_output, median_sorted
+
 def extract_delta_measurements(log_dir):
     """Extract delta measurements from all log files"""
     
-    aa_correct_deltas = []
-    aa_misdetected_deltas = []
-    aaa_correct_deltas = []
-    aaa_failed_deltas = []
-    
-    log_files = []
-    if os.path.exists(log_dir):
-        for filename in os.listdir(log_dir):
-            if filename.endswith('.log'):
-                log_files.append(os.path.join(log_dir, filename))
+    # Test type is determined from the filename; 'both' logs are skipped
+    log_files, jobs = scan_test_logs(log_dir)
     
     print(f"📁 Analyzing {len(log_files)} log files for delta patterns...")
     
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-            
-            # Determine test type from filename
-            test_type = None
-            if 'aa_' in os.path.basename(log_file):
-                test_type = 'aa'
-            elif 'aaa_' in os.path.basename(log_file):
-                test_type = 'aaa'
-            else:
-                continue  # Skip 'both' files as we can't determine expected type
-            
-            # Extract delta measurements
-            pattern = r'(✅|🚨)\s+SLOT\s+\d+:\s+(KLVR-AA|KLVR-AAA)\s+\|\s+AAA_ON=\d+mV\s+\|\s+AAA_OFF=\d+mV\s+\|\s+Δ=\s*(-?\d+)mV'
-            
-            for match in re.finditer(pattern, content):
-                status = match.group(1)
-                detected_type = match.group(2)
-                delta = int(match.group(3))
-                
-                if test_type == 'aa':
-                    # AA battery test - we expect KLVR-AA detection
-                    if detected_type == 'KLVR-AA':
-                        aa_correct_deltas.append(delta)
-                    else:  # detected_type == 'KLVR-AAA'
-                        aa_misdetected_deltas.append(delta)
-                        
-                elif test_type == 'aaa':
-                    # AAA battery test - we expect KLVR-AAA detection
-                    if detected_type == 'KLVR-AAA':
-                        aaa_correct_deltas.append(delta)
-                    else:  # detected_type == 'KLVR-AA'
-                        aaa_failed_deltas.append(delta)
-                        
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-    
-    return aa_correct_deltas, aa_misdetected_deltas, aaa_correct_deltas, aaa_failed_deltas
+    return load_test_deltas(jobs)
 
+@buffered_output
 def analyze_delta_patterns(aa_correct, aa_misdetected, aaa_correct, aaa_failed):
     """Analyze delta patterns to find optimal thresholds"""
     
@@ -77,24 +31,30 @@ def analyze_delta_patterns(aa_correct, aa_misdetected, aaa_correct, aaa_failed):
     print(f"AAA Correct detections: {len(aaa_correct):,} samples")
     print(f"AAA Failed (detected as AA): {len(aaa_failed):,} samples")
     
+    # Absolute AA deltas, sorted once and reused by every section below:
+    # percentiles, median, min/max and range counts all come from these
+    aa_abs_deltas = sorted(abs(d) for d in aa_correct)
+    aa_mis_abs_deltas = sorted(abs(d) for d in aa_misdetected)
+    
     # Analyze AA battery deltas (should be small)
     if aa_correct:
         print(f"\n📊 AA BATTERY DELTA ANALYSIS (Correct Detections)")
         print(f"-" * 50)
-        aa_abs_deltas = [abs(d) for d in aa_correct]
+        n = len(aa_abs_deltas)
+        p95, p99, p999 = (aa_abs_deltas[int(p * n)] for p in (0.95, 0.99, 0.999))
         
         print(f"Delta range: {min(aa_correct)}mV to {max(aa_correct)}mV")
-        print(f"Absolute delta range: 0mV to {max(aa_abs_deltas)}mV")
-        print(f"Mean absolute delta: {statistics.mean(aa_abs_deltas):.1f}mV")
-        print(f"Median absolute delta: {statistics.median(aa_abs_deltas):.1f}mV")
-        print(f"95th percentile: {sorted(aa_abs_deltas)[int(0.95 * len(aa_abs_deltas))]:.1f}mV")
-        print(f"99th percentile: {sorted(aa_abs_deltas)[int(0.99 * len(aa_abs_deltas))]:.1f}mV")
-        print(f"99.9th percentile: {sorted(aa_abs_deltas)[int(0.999 * len(aa_abs_deltas))]:.1f}mV")
+        print(f"Absolute delta range: 0mV to {aa_abs_deltas[-1]}mV")
+        print(f"Mean absolute delta: {sum(aa_abs_deltas) / n:.1f}mV")
+        print(f"Median absolute delta: {median_sorted(aa_abs_deltas):.1f}mV")
+        print(f"95th percentile: {p95:.1f}mV")
+        print(f"99th percentile: {p99:.1f}mV")
+        print(f"99.9th percentile: {p999:.1f}mV")
         
         # Distribution analysis
-        small_deltas = len([d for d in aa_abs_deltas if d <= 50])
-        medium_deltas = len([d for d in aa_abs_deltas if 50 < d <= 100])
-        large_deltas = len([d for d in aa_abs_deltas if d > 100])
+        small_deltas = bisect_right(aa_abs_deltas, 50)
+        medium_deltas = bisect_right(aa_abs_deltas, 100) - small_deltas
+        large_deltas = n - small_deltas - medium_deltas
         
         print(f"\nDelta distribution:")
         print(f"  |Δ| ≤ 50mV: {small_deltas:,} ({small_deltas/len(aa_abs_deltas)*100:.1f}%)")
@@ -105,17 +65,16 @@ def analyze_delta_patterns(aa_correct, aa_misdetected, aaa_correct, aaa_failed):
     if aa_misdetected:
         print(f"\n🚨 AA BATTERY MISDETECTIONS (Detected as AAA)")
         print(f"-" * 50)
-        aa_mis_abs_deltas = [abs(d) for d in aa_misdetected]
         
         print(f"Delta range: {min(aa_misdetected)}mV to {max(aa_misdetected)}mV")
-        print(f"Absolute delta range: {min(aa_mis_abs_deltas)}mV to {max(aa_mis_abs_deltas)}mV")
-        print(f"Mean absolute delta: {statistics.mean(aa_mis_abs_deltas):.1f}mV")
-        print(f"Median absolute delta: {statistics.median(aa_mis_abs_deltas):.1f}mV")
+        print(f"Absolute delta range: {aa_mis_abs_deltas[0]}mV to {aa_mis_abs_deltas[-1]}mV")
+        print(f"Mean absolute delta: {sum(aa_mis_abs_deltas) / len(aa_mis_abs_deltas):.1f}mV")
+        print(f"Median absolute delta: {median_sorted(aa_mis_abs_deltas):.1f}mV")
         
         # Find the threshold that separates good AA from misdetected AA
         if aa_correct:
-            aa_good_max = max([abs(d) for d in aa_correct])
-            aa_bad_min = min(aa_mis_abs_deltas)
+            aa_good_max = aa_abs_deltas[-1]
+            aa_bad_min = aa_mis_abs_deltas[0]
             
             print(f"\n🎯 SEPARATION ANALYSIS:")
             print(f"Max good AA delta: {aa_good_max}mV")
@@ -131,24 +90,25 @@ def analyze_delta_patterns(aa_correct, aa_misdetected, aaa_correct, aaa_failed):
     if aaa_correct:
         print(f"\n📊 AAA BATTERY DELTA ANALYSIS (Correct Detections)")
         print(f"-" * 50)
-        aaa_abs_deltas = [abs(d) for d in aaa_correct]
+        aaa_abs_deltas = sorted(abs(d) for d in aaa_correct)
         
         print(f"Delta range: {min(aaa_correct)}mV to {max(aaa_correct)}mV")
-        print(f"Absolute delta range: {min(aaa_abs_deltas)}mV to {max(aaa_abs_deltas)}mV")
-        print(f"Mean absolute delta: {statistics.mean(aaa_abs_deltas):.1f}mV")
-        print(f"Median absolute delta: {statistics.median(aaa_abs_deltas):.1f}mV")
+        print(f"Absolute delta range: {aaa_abs_deltas[0]}mV to {aaa_abs_deltas[-1]}mV")
+        print(f"Mean absolute delta: {sum(aaa_abs_deltas) / len(aaa_abs_deltas):.1f}mV")
+        print(f"Median absolute delta: {median_sorted(aaa_abs_deltas):.1f}mV")
     
     # Analyze AAA detection failures (detected as AA - should have small deltas)
     if aaa_failed:
         print(f"\n🚨 AAA BATTERY DETECTION FAILURES (Detected as AA)")
         print(f"-" * 50)
-        aaa_fail_abs_deltas = [abs(d) for d in aaa_failed]
+        aaa_fail_abs_deltas = sorted(abs(d) for d in aaa_failed)
         
         print(f"Delta range: {min(aaa_failed)}mV to {max(aaa_failed)}mV")
-        print(f"Absolute delta range: {min(aaa_fail_abs_deltas)}mV to {max(aaa_fail_abs_deltas)}mV")
-        print(f"Mean absolute delta: {statistics.mean(aaa_fail_abs_deltas):.1f}mV")
-        print(f"Median absolute delta: {statistics.median(aaa_fail_abs_deltas):.1f}mV")
+        print(f"Absolute delta range: {aaa_fail_abs_deltas[0]}mV to {aaa_fail_abs_deltas[-1]}mV")
+        print(f"Mean absolute delta: {sum(aaa_fail_abs_deltas) / len(aaa_fail_abs_deltas):.1f}mV")
+        print(f"Median absolute delta: {median_sorted(aaa_fail_abs_deltas):.1f}mV")
 
+@buffered_output
 def recommend_optimal_threshold(aa_correct, aa_misdetected, aaa_correct, aaa_failed):
     """Recommend optimal threshold based on delta analysis"""
     
@@ -159,13 +119,11 @@ def recommend_optimal_threshold(aa_correct, aa_misdetected, aaa_correct, aaa_fai
         print("❌ Insufficient AA data for analysis")
         return
     
-    aa_abs_deltas = [abs(d) for d in aa_correct]
+    aa_abs_deltas = sorted(abs(d) for d in aa_correct)
     
-    # Calculate key percentiles for AA batteries
-    p90 = sorted(aa_abs_deltas)[int(0.90 * len(aa_abs_deltas))]
-    p95 = sorted(aa_abs_deltas)[int(0.95 * len(aa_abs_deltas))]
-    p99 = sorted(aa_abs_deltas)[int(0.99 * len(aa_abs_deltas))]
-    p999 = sorted(aa_abs_deltas)[int(0.999 * len(aa_abs_deltas))]
+    # Calculate key percentiles for AA batteries (one sort, four lookups)
+    n = len(aa_abs_deltas)
+    p90, p95, p99, p999 = (aa_abs_deltas[int(p * n)] for p in (0.90, 0.95, 0.99, 0.999))
     
     print(f"\n📈 AA BATTERY DELTA PERCENTILES:")
     print(f"90th percentile: {p90}mV")
@@ -173,11 +131,13 @@ def recommend_optimal_threshold(aa_correct, aa_misdetected, aaa_correct, aaa_fai
     print(f"99th percentile: {p99}mV")
     print(f"99.9th percentile: {p999}mV")
     
+    # Sorted once; reused by the performance analysis and final choice below
+    aa_mis_abs_deltas = sorted(abs(d) for d in aa_misdetected)
+    
     # Analyze misdetection threshold
     if aa_misdetected:
-        aa_mis_abs_deltas = [abs(d) for d in aa_misdetected]
-        misdetection_min = min(aa_mis_abs_deltas)
-        misdetection_mean = statistics.mean(aa_mis_abs_deltas)
+        misdetection_min = aa_mis_abs_deltas[0]
+        misdetection_mean = sum(aa_mis_abs_deltas) / len(aa_mis_abs_deltas)
         
         print(f"\n🚨 MISDETECTION ANALYSIS:")
         print(f"Minimum misdetection delta: {misdetection_min}mV")
@@ -218,18 +178,16 @@ def recommend_optimal_threshold(aa_correct, aa_misdetected, aaa_correct, aaa_fai
     
     # Performance analysis
     if aa_misdetected:
-        aa_mis_abs_deltas = [abs(d) for d in aa_misdetected]
-        
         print(f"\n📊 PERFORMANCE ANALYSIS:")
         
         for name, threshold in [("Conservative", p99), ("Balanced", p95), ("Ultra-Conservative", p999)]:
             # Calculate how many misdetections would be caught
-            caught_misdetections = len([d for d in aa_mis_abs_deltas if d > threshold])
             total_misdetections = len(aa_mis_abs_deltas)
+            caught_misdetections = total_misdetections - bisect_right(aa_mis_abs_deltas, threshold)
             
             # Calculate how many good AAs would be lost
-            lost_good_aa = len([d for d in aa_abs_deltas if d > threshold])
             total_good_aa = len(aa_abs_deltas)
+            lost_good_aa = total_good_aa - bisect_right(aa_abs_deltas, threshold)
             
             print(f"\n{name} ({threshold}mV):")
             print(f"   Would catch {caught_misdetections}/{total_misdetections} misdetections ({caught_misdetections/total_misdetections*100:.1f}%)")
@@ -239,11 +197,10 @@ def recommend_optimal_threshold(aa_correct, aa_misdetected, aaa_correct, aaa_fai
     
     # Choose based on data characteristics
     if aa_misdetected:
-        aa_mis_abs_deltas = [abs(d) for d in aa_misdetected]
-        if min(aa_mis_abs_deltas) > p99:
+        if aa_mis_abs_deltas[0] > p99:
             recommended = p99
             confidence = "HIGH"
-        elif min(aa_mis_abs_deltas) > p95:
+        elif aa_mis_abs_deltas[0] > p95:
             recommended = p95  
             confidence = "MEDIUM"
         else:
@@ -3,44 +3,23 @@
 Detailed Delta Analysis - Let's look at the actual distribution patterns
 """
 
-import os
-import re
 import statistics
+from bisect import bisect_left, bisect_right
 from collections import Counter
 
+from _log_cache import load_test_deltas, scan_test_logs
+from _reporting import buffered_output
+
 def analyze_actual_delta_distribution():
     """Analyze the actual delta distribution to find real patterns"""
     
-    aa_deltas = []
-    aa_misdetected_deltas = []
+    _, jobs = scan_test_logs("logs")
+    aa_jobs = [job for job in jobs if job[1] == 'aa']
     
-    log_files = []
-    for filename in os.listdir("logs"):
-        if filename.endswith('.log') and 'aa_' in filename:
-            log_files.append(os.path.join("logs", filename))
+    print(f"📁 Analyzing {len(aa_jobs)} AA test log files...")
     
-    print(f"📁 Analyzing {len(log_files)} AA test log files...")
-    
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-            
-            # Extract all delta measurements from AA tests
-            pattern = r'(✅|🚨)\s+SLOT\s+\d+:\s+(KLVR-AA|KLVR-AAA)\s+\|\s+AAA_ON=\d+mV\s+\|\s+AAA_OFF=\d+mV\s+\|\s+Δ=\s*(-?\d+)mV'
-            
-            for match in re.finditer(pattern, content):
-                status = match.group(1)
-                detected_type = match.group(2)
-                delta = int(match.group(3))
-                
-                if detected_type == 'KLVR-AA':
-                    aa_deltas.append(delta)  # Correctly detected as AA
-                else:  # detected_type == 'KLVR-AAA'
-                    aa_misdetected_deltas.append(delta)  # AA misdetected as AAA
-                        
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
+    # Correct AA detections vs. AA misdetected as AAA
+    aa_deltas, aa_misdetected_deltas, _, _ = load_test_deltas(aa_jobs)
     
     print(f"\n📊 RAW DATA ANALYSIS")
     print(f"=" * 60)
@@ -64,78 +43,88 @@ def analyze_actual_delta_distribution():
         (500, 3000, "Very Large")
     ]
     
-    for min_val, max_val, label in ranges:
-        count = len([d for d in aa_deltas if min_val <= d < max_val])
-        if count > 0:
-            percentage = count / len(aa_deltas) * 100
-            print(f"  {label:15} ({min_val:4d} to {max_val:3d}mV): {count:8,} ({percentage:5.1f}%)")
+    # One sort serves every range count (and the percentiles below)
+    aa_sorted = sorted(aa_deltas)
     
-    # Find the most common delta values
+    # Tables are formatted up front and printed with a single join
+    total = len(aa_deltas)
+    range_counts = [(min_val, max_val, label,
+                     bisect_left(aa_sorted, max_val) - bisect_left(aa_sorted, min_val))
+                    for min_val, max_val, label in ranges]
+    rows = [f"  {label:15} ({min_val:4d} to {max_val:3d}mV): {count:8,} ({count / total * 100:5.1f}%)"
+            for min_val, max_val, label, count in range_counts if count > 0]
+    if rows:
+        print('\n'.join(rows))
+    
+    # Find the most common delta values. The Counter doubles as the set of
+    # distinct deltas for the breakpoint analysis below.
     print(f"\n🎯 MOST COMMON DELTA VALUES:")
     delta_counts = Counter(aa_deltas)
     most_common = delta_counts.most_common(20)
     
-    for delta, count in most_common:
-        percentage = count / len(aa_deltas) * 100
-        print(f"  Δ = {delta:4d}mV: {count:8,} times ({percentage:5.1f}%)")
+    rows = [f"  Δ = {delta:4d}mV: {count:8,} times ({count / total * 100:5.1f}%)"
+            for delta, count in most_common]
+    if rows:
+        print('\n'.join(rows))
     
     # Analyze misdetections
     if aa_misdetected_deltas:
         print(f"\n🚨 MISDETECTION PATTERN ANALYSIS:")
         mis_counter = Counter(aa_misdetected_deltas)
         print(f"Total misdetections: {len(aa_misdetected_deltas):,}")
-        print(f"Misdetection range: {min(aa_misdetected_deltas)}mV to {max(aa_misdetected_deltas)}mV")
+        print(f"Misdetection range: {min(mis_counter)}mV to {max(mis_counter)}mV")
         
         print(f"\nMost common misdetection deltas:")
-        for delta, count in mis_counter.most_common(10):
-            percentage = count / len(aa_misdetected_deltas) * 100
-            print(f"  Δ = {delta:4d}mV: {count:6,} times ({percentage:5.1f}%)")
+        mis_total = len(aa_misdetected_deltas)
+        print('\n'.join(f"  Δ = {delta:4d}mV: {count:6,} times ({count / mis_total * 100:5.1f}%)"
+                        for delta, count in mis_counter.most_common(10)))
     
     # Statistical analysis
     print(f"\n📈 STATISTICAL SUMMARY:")
     print(f"AA Deltas:")
     print(f"  Mean: {statistics.mean(aa_deltas):.1f}mV")
     print(f"  Median: {statistics.median(aa_deltas):.1f}mV")
-    print(f"  Mode: {statistics.mode(aa_deltas)}mV")
+    # statistics.mode() would rebuild the same Counter; its first
+    # most_common entry is the same (first-seen) mode
+    print(f"  Mode: {most_common[0][0]}mV")
     print(f"  Range: {min(aa_deltas)}mV to {max(aa_deltas)}mV")
     
     # Find natural breakpoints
     print(f"\n🎯 NATURAL BREAKPOINT ANALYSIS:")
     
     # Look for gaps in the distribution
-    unique_deltas = sorted(set(aa_deltas))
-    gaps = []
-    for i in range(len(unique_deltas)-1):
-        gap = unique_deltas[i+1] - unique_deltas[i]
-        if gap > 10:  # Significant gap
-            gaps.append((unique_deltas[i], unique_deltas[i+1], gap))
+    unique_deltas = sorted(delta_counts)
+    gaps = [(start, end, end - start)
+            for start, end in zip(unique_deltas, unique_deltas[1:])
+            if end - start > 10]  # Significant gap
     
     print(f"Significant gaps in AA delta distribution:")
-    for start, end, gap_size in gaps[:10]:  # Show top 10 gaps
-        print(f"  Gap from {start}mV to {end}mV (size: {gap_size}mV)")
+    rows = [f"  Gap from {start}mV to {end}mV (size: {gap_size}mV)"
+            for start, end, gap_size in gaps[:10]]  # Show top 10 gaps
+    if rows:
+        print('\n'.join(rows))
     
     # Percentile analysis for practical ranges
-    aa_sorted = sorted(aa_deltas)
     percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99, 99.5, 99.9]
     
     print(f"\n📊 PERCENTILE ANALYSIS:")
-    for p in percentiles:
-        idx = int(p/100 * len(aa_sorted))
-        if idx >= len(aa_sorted):
-            idx = len(aa_sorted) - 1
-        value = aa_sorted[idx]
-        print(f"  {p:4.1f}th percentile: {value:4d}mV")
+    last = len(aa_sorted) - 1
+    print('\n'.join(f"  {p:4.1f}th percentile: {aa_sorted[min(int(p/100 * len(aa_sorted)), last)]:4d}mV"
+                    for p in percentiles))
     
     return aa_deltas, aa_misdetected_deltas
 
+@buffered_output
 def recommend_based_on_real_data(aa_deltas, aa_misdetected_deltas):
     """Make recommendations based on actual data patterns"""
     
     print(f"\n🎯 DATA-DRIVEN RECOMMENDATIONS")
     print(f"=" * 60)
     
-    # Find where most AA batteries actually cluster
+    # Find where most AA batteries actually cluster. Sorted copies turn every
+    # "how many fall inside/outside this range" question into bisect lookups.
     aa_sorted = sorted(aa_deltas)
+    mis_sorted = sorted(aa_misdetected_deltas)
     
     # Different coverage levels
     coverage_levels = [
@@ -147,40 +136,37 @@ def recommend_based_on_real_data(aa_deltas, aa_misdetected_deltas):
     
     print(f"\n📊 AA RANGE OPTIONS (based on actual data):")
     
-    for coverage, label in coverage_levels:
-        # Calculate symmetric range around median
-        median = statistics.median(aa_deltas)
-        
-        # Find range that captures the specified percentage
-        lower_idx = int((100 - coverage) / 2 / 100 * len(aa_sorted))
-        upper_idx = int((100 + coverage) / 2 / 100 * len(aa_sorted))
-        if upper_idx >= len(aa_sorted):
-            upper_idx = len(aa_sorted) - 1
-            
-        lower_bound = aa_sorted[lower_idx]
-        upper_bound = aa_sorted[upper_idx]
-        
+    # Symmetric range that captures each coverage level, with the upper
+    # index clamped to the last sample
+    n = len(aa_sorted)
+    bounds = [(aa_sorted[int((100 - coverage) / 2 / 100 * n)],
+               aa_sorted[min(int((100 + coverage) / 2 / 100 * n), n - 1)])
+              for coverage, _ in coverage_levels]
+    
+    rows = []
+    for (coverage, label), (lower_bound, upper_bound) in zip(coverage_levels, bounds):
         # Count how many would be lost
-        lost_count = len([d for d in aa_deltas if d < lower_bound or d > upper_bound])
+        lost_count = bisect_left(aa_sorted, lower_bound) + n - bisect_right(aa_sorted, upper_bound)
         lost_percentage = lost_count / len(aa_deltas) * 100
         
-        print(f"\n{label} ({coverage}% coverage):")
-        print(f"  Range: {lower_bound}mV to {upper_bound}mV")
-        print(f"  Would lose: {lost_count:,} AA batteries ({lost_percentage:.1f}%)")
+        rows.append(f"\n{label} ({coverage}% coverage):")
+        rows.append(f"  Range: {lower_bound}mV to {upper_bound}mV")
+        rows.append(f"  Would lose: {lost_count:,} AA batteries ({lost_percentage:.1f}%)")
         
         # Check overlap with misdetections
         if aa_misdetected_deltas:
-            overlap = len([d for d in aa_misdetected_deltas if lower_bound <= d <= upper_bound])
+            overlap = bisect_right(mis_sorted, upper_bound) - bisect_left(mis_sorted, lower_bound)
             overlap_percentage = overlap / len(aa_misdetected_deltas) * 100 if aa_misdetected_deltas else 0
-            print(f"  Would incorrectly include: {overlap:,} misdetections ({overlap_percentage:.1f}%)")
+            rows.append(f"  Would incorrectly include: {overlap:,} misdetections ({overlap_percentage:.1f}%)")
+    print('\n'.join(rows))
     
     # Find the optimal separation point
     if aa_misdetected_deltas:
         print(f"\n🔍 OPTIMAL SEPARATION ANALYSIS:")
         
         # Find the gap between good AAs and misdetections
-        max_good_aa = max(aa_deltas)
-        min_misdetection = min(aa_misdetected_deltas)
+        max_good_aa = aa_sorted[-1]
+        min_misdetection = mis_sorted[0]
         
         print(f"Maximum good AA delta: {max_good_aa}mV")
         print(f"Minimum misdetection delta: {min_misdetection}mV")
@@ -193,8 +179,8 @@ def recommend_based_on_real_data(aa_deltas, aa_misdetected_deltas):
             print(f"⚠️  OVERLAP EXISTS: {min_misdetection}mV to {max_good_aa}mV")
             
             # Find best compromise
-            overlap_deltas = [d for d in aa_deltas if d >= min_misdetection]
-            print(f"   {len(overlap_deltas):,} good AAs would be lost if using {min_misdetection}mV threshold")
+            overlap_count = len(aa_sorted) - bisect_left(aa_sorted, min_misdetection)
+            print(f"   {overlap_count:,} good AAs would be lost if using {min_misdetection}mV threshold")
     
     # Final recommendation
     print(f"\n✨ FINAL RECOMMENDATION:")
@@ -205,7 +191,7 @@ def recommend_based_on_real_data(aa_deltas, aa_misdetected_deltas):
     
     # But check if we can do better by looking at the actual distribution
     # Most AAs are near 0, so let's be more aggressive
-    near_zero_count = len([d for d in aa_deltas if -50 <= d <= 50])
+    near_zero_count = bisect_right(aa_sorted, 50) - bisect_left(aa_sorted, -50)
     near_zero_percentage = near_zero_count / len(aa_deltas) * 100
     
     print(f"\n📊 NEAR-ZERO ANALYSIS:")
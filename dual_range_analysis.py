@@ -4,70 +4,64 @@ Dual Range Analysis for AA and AAA Battery Detection
 Find optimal delta ranges: AA around 0mV, AAA around 300mV
 """
 
-import os
-import re
-import statistics
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 
+from _log_cache import DELTA_TYPECODE, map_logs, scan_test_logs, split_test_deltas
+from _reporting import DeltaStats, accumulate, buffered_output, new_totals
+
 def extract_all_delta_measurements(log_dir):
-    """Extract all delta measurements and categorize by expected battery type"""
+    """Extract all delta measurements and categorize by expected battery type
+
+    Besides the four delta series (each a sorted int16 array), returns a DeltaStats per
+    non-empty series, keyed 'aa', 'aaa', 'aa_mis' and 'aaa_mis'. Its totals
+    are accumulated while parsing, so the summary needs no extra pass.
+    """
     
-    aa_deltas = []  # From AA test logs - should be around 0mV
-    aaa_deltas = []  # From AAA test logs - should be around 300mV
-    aa_misdetections = []  # AA batteries detected as AAA
-    aaa_misdetections = []  # AAA batteries detected as AA
+    # Packed int16 buffers instead of lists of boxed ints; the workers'
+    # arrays are appended with a plain memory copy
+    aa_deltas = array(DELTA_TYPECODE)  # From AA test logs - should be around 0mV
+    aaa_deltas = array(DELTA_TYPECODE)  # From AAA test logs - should be around 300mV
+    aa_misdetections = array(DELTA_TYPECODE)  # AA batteries detected as AAA
+    aaa_misdetections = array(DELTA_TYPECODE)  # AAA batteries detected as AA
+    totals = defaultdict(new_totals)
     
-    log_files = []
-    if os.path.exists(log_dir):
-        for filename in os.listdir(log_dir):
-            if filename.endswith('.log'):
-                log_files.append(os.path.join(log_dir, filename))
+    log_files, jobs = scan_test_logs(log_dir)
     
     print(f"📁 Analyzing {len(log_files)} log files for dual range patterns...")
     
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-            
-            # Determine test type from filename
-            test_type = None
-            if 'aa_' in os.path.basename(log_file):
-                test_type = 'aa'
-            elif 'aaa_' in os.path.basename(log_file):
-                test_type = 'aaa'
-            else:
-                continue  # Skip 'both' files
-            
-            # Extract measurements
-            pattern = r'(✅|🚨)\s+SLOT\s+\d+:\s+(KLVR-AA|KLVR-AAA)\s+\|\s+AAA_ON=\d+mV\s+\|\s+AAA_OFF=\d+mV\s+\|\s+Δ=\s*(-?\d+)mV'
-            
-            for match in re.finditer(pattern, content):
-                status = match.group(1)
-                detected_type = match.group(2)
-                delta = int(match.group(3))
-                
-                if test_type == 'aa':
-                    # AA battery test - deltas should be around 0mV
-                    if detected_type == 'KLVR-AA':
-                        aa_deltas.append(delta)  # Correct AA detection
-                    else:  # detected_type == 'KLVR-AAA'
-                        aa_misdetections.append(delta)  # AA misdetected as AAA
-                        
-                elif test_type == 'aaa':
-                    # AAA battery test - deltas should be around 300mV
-                    if detected_type == 'KLVR-AAA':
-                        aaa_deltas.append(delta)  # Correct AAA detection
-                    else:  # detected_type == 'KLVR-AA'
-                        aaa_misdetections.append(delta)  # AAA misdetected as AA
-                        
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-    
-    return aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections
+    for (_, test_type, _), (right, missed, message) in zip(jobs, map_logs(split_test_deltas, jobs)):
+        if message:
+            print(message)
+        if test_type == 'aa':
+            aa_deltas.extend(right)  # Correct AA detection
+            aa_misdetections.extend(missed)  # AA misdetected as AAA
+        else:
+            aaa_deltas.extend(right)  # Correct AAA detection
+            aaa_misdetections.extend(missed)  # AAA misdetected as AA
+        accumulate(totals[test_type], right)
+        accumulate(totals[test_type + '_mis'], missed)
+    
+    # Sort each series once here (arrays have no in-place sort, so it is
+    # sorted and repacked); the summaries and every percentile lookup
+    # downstream index into these instead of sorting their own copy
+    series = {'aa': aa_deltas, 'aaa': aaa_deltas,
+              'aa_mis': aa_misdetections, 'aaa_mis': aaa_misdetections}
+    stats = {}
+    for name, values in series.items():
+        series[name] = values = array(DELTA_TYPECODE, sorted(values))
+        if values:
+            stats[name] = DeltaStats.from_sorted(values, totals[name])
+    
+    return series['aa'], series['aaa'], series['aa_mis'], series['aaa_mis'], stats
+
+@buffered_output
+def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections, stats):
+    """Analyze the dual range patterns for AA and AAA batteries
 
-def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections):
-    """Analyze the dual range patterns for AA and AAA batteries"""
+    stats holds the per-series DeltaStats from extract_all_delta_measurements.
+    """
     
     print(f"\n🔬 DUAL RANGE ANALYSIS")
     print(f"=" * 60)
@@ -81,22 +75,17 @@ def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetectio
         print(f"\n📊 AA BATTERY RANGE ANALYSIS (Expected ~0mV)")
         print(f"-" * 50)
         
-        aa_mean = statistics.mean(aa_deltas)
-        aa_median = statistics.median(aa_deltas)
-        aa_std = statistics.stdev(aa_deltas) if len(aa_deltas) > 1 else 0
-        aa_min, aa_max = min(aa_deltas), max(aa_deltas)
+        aa_stats = stats['aa']
+        aa_mean, aa_std, aa_median = aa_stats.mean, aa_stats.std, aa_stats.median
+        aa_min, aa_max = aa_stats.min, aa_stats.max
         
         print(f"Range: {aa_min}mV to {aa_max}mV")
         print(f"Mean: {aa_mean:.1f}mV")
         print(f"Median: {aa_median:.1f}mV")
         print(f"Std Dev: {aa_std:.1f}mV")
         
-        # Calculate percentiles for range definition
-        aa_sorted = sorted(aa_deltas)
-        aa_p1 = aa_sorted[int(0.01 * len(aa_sorted))]
-        aa_p5 = aa_sorted[int(0.05 * len(aa_sorted))]
-        aa_p95 = aa_sorted[int(0.95 * len(aa_sorted))]
-        aa_p99 = aa_sorted[int(0.99 * len(aa_sorted))]
+        # Percentiles for range definition
+        aa_p1, aa_p5, aa_p95, aa_p99 = (aa_stats.percentiles[p] for p in (1, 5, 95, 99))
         
         print(f"1st percentile: {aa_p1}mV")
         print(f"5th percentile: {aa_p5}mV")
@@ -109,7 +98,7 @@ def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetectio
         print(f"\n🎯 Suggested AA Range: {aa_range_min}mV to {aa_range_max}mV")
         
         # Distribution around 0mV
-        near_zero = len([d for d in aa_deltas if -50 <= d <= 50])
+        near_zero = bisect_right(aa_deltas, 50) - bisect_left(aa_deltas, -50)
         print(f"Measurements within ±50mV of 0: {near_zero:,} ({near_zero/len(aa_deltas)*100:.1f}%)")
     
     # Analyze AAA battery range (should be around 300mV)
@@ -117,22 +106,17 @@ def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetectio
         print(f"\n📊 AAA BATTERY RANGE ANALYSIS (Expected ~300mV)")
         print(f"-" * 50)
         
-        aaa_mean = statistics.mean(aaa_deltas)
-        aaa_median = statistics.median(aaa_deltas)
-        aaa_std = statistics.stdev(aaa_deltas) if len(aaa_deltas) > 1 else 0
-        aaa_min, aaa_max = min(aaa_deltas), max(aaa_deltas)
+        aaa_stats = stats['aaa']
+        aaa_mean, aaa_std, aaa_median = aaa_stats.mean, aaa_stats.std, aaa_stats.median
+        aaa_min, aaa_max = aaa_stats.min, aaa_stats.max
         
         print(f"Range: {aaa_min}mV to {aaa_max}mV")
         print(f"Mean: {aaa_mean:.1f}mV")
         print(f"Median: {aaa_median:.1f}mV")
         print(f"Std Dev: {aaa_std:.1f}mV")
         
-        # Calculate percentiles for range definition
-        aaa_sorted = sorted(aaa_deltas)
-        aaa_p1 = aaa_sorted[int(0.01 * len(aaa_sorted))]
-        aaa_p5 = aaa_sorted[int(0.05 * len(aaa_sorted))]
-        aaa_p95 = aaa_sorted[int(0.95 * len(aaa_sorted))]
-        aaa_p99 = aaa_sorted[int(0.99 * len(aaa_sorted))]
+        # Percentiles for range definition
+        aaa_p1, aaa_p5, aaa_p95, aaa_p99 = (aaa_stats.percentiles[p] for p in (1, 5, 95, 99))
         
         print(f"1st percentile: {aaa_p1}mV")
         print(f"5th percentile: {aaa_p5}mV")
@@ -145,15 +129,15 @@ def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetectio
         print(f"\n🎯 Suggested AAA Range: {aaa_range_min}mV to {aaa_range_max}mV")
         
         # Distribution around 300mV
-        near_300 = len([d for d in aaa_deltas if 250 <= d <= 350])
+        near_300 = bisect_right(aaa_deltas, 350) - bisect_left(aaa_deltas, 250)
         print(f"Measurements within 250-350mV: {near_300:,} ({near_300/len(aaa_deltas)*100:.1f}%)")
     
     # Analyze misdetections
     if aa_misdetections:
         print(f"\n🚨 AA MISDETECTIONS (Detected as AAA)")
         print(f"-" * 40)
-        aa_mis_mean = statistics.mean(aa_misdetections)
-        aa_mis_range = f"{min(aa_misdetections)}mV to {max(aa_misdetections)}mV"
+        aa_mis_mean = stats['aa_mis'].mean
+        aa_mis_range = f"{stats['aa_mis'].min}mV to {stats['aa_mis'].max}mV"
         print(f"Range: {aa_mis_range}")
         print(f"Mean: {aa_mis_mean:.1f}mV")
         print("These AA batteries were incorrectly detected as AAA")
@@ -161,14 +145,15 @@ def analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetectio
     if aaa_misdetections:
         print(f"\n🚨 AAA MISDETECTIONS (Detected as AA)")
         print(f"-" * 40)
-        aaa_mis_mean = statistics.mean(aaa_misdetections)
-        aaa_mis_range = f"{min(aaa_misdetections)}mV to {max(aaa_misdetections)}mV"
+        aaa_mis_mean = stats['aaa_mis'].mean
+        aaa_mis_range = f"{stats['aaa_mis'].min}mV to {stats['aaa_mis'].max}mV"
         print(f"Range: {aaa_mis_range}")
         print(f"Mean: {aaa_mis_mean:.1f}mV")
         print("These AAA batteries were incorrectly detected as AA")
 
-def recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections):
-    """Recommend optimal dual ranges based on analysis"""
+@buffered_output
+def recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections, stats):
+    """Recommend optimal dual ranges based on analysis (reuses analyze's DeltaStats)"""
     
     print(f"\n🎯 DUAL RANGE RECOMMENDATIONS")
     print(f"=" * 60)
@@ -178,12 +163,8 @@ def recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetect
         return
     
     # Calculate AA range (centered around 0mV)
-    aa_sorted = sorted(aa_deltas)
-    aa_p1 = aa_sorted[int(0.01 * len(aa_sorted))]
-    aa_p5 = aa_sorted[int(0.05 * len(aa_sorted))]
-    aa_p95 = aa_sorted[int(0.95 * len(aa_sorted))]
-    aa_p99 = aa_sorted[int(0.99 * len(aa_sorted))]
-    aa_mean = statistics.mean(aa_deltas)
+    aa_p1, aa_p5, aa_p95, aa_p99 = (stats['aa'].percentiles[p] for p in (1, 5, 95, 99))
+    aa_mean = stats['aa'].mean
     
     print(f"\n📊 AA BATTERY RANGE (Centered ~0mV):")
     print(f"Mean delta: {aa_mean:.1f}mV")
@@ -197,12 +178,8 @@ def recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetect
     
     # Calculate AAA range (centered around 300mV) if we have data
     if aaa_deltas:
-        aaa_sorted = sorted(aaa_deltas)
-        aaa_p1 = aaa_sorted[int(0.01 * len(aaa_sorted))]
-        aaa_p5 = aaa_sorted[int(0.05 * len(aaa_sorted))]
-        aaa_p95 = aaa_sorted[int(0.95 * len(aaa_sorted))]
-        aaa_p99 = aaa_sorted[int(0.99 * len(aaa_sorted))]
-        aaa_mean = statistics.mean(aaa_deltas)
+        aaa_p1, aaa_p5, aaa_p95, aaa_p99 = (stats['aaa'].percentiles[p] for p in (1, 5, 95, 99))
+        aaa_mean = stats['aaa'].mean
         
         print(f"\n📊 AAA BATTERY RANGE (Centered ~300mV):")
         print(f"Mean delta: {aaa_mean:.1f}mV")
@@ -287,13 +264,13 @@ def main():
     print("=" * 60)
     
     # Extract measurements
-    aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections = extract_all_delta_measurements("logs")
+    aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections, stats = extract_all_delta_measurements("logs")
     
     # Analyze patterns
-    analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections)
+    analyze_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections, stats)
     
     # Generate recommendations
-    ranges = recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections)
+    ranges = recommend_dual_ranges(aa_deltas, aaa_deltas, aa_misdetections, aaa_misdetections, stats)
     
     print(f"\n💾 Analysis complete. Recommended ranges:")
     print(f"   AA: {ranges['aa_min']} to {ranges['aa_max']} mV")
@@ -4,89 +4,84 @@ Proper Dual Range Analysis - Separate AA and AAA measurement files
 """
 
 import os
-import re
-import statistics
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import Counter
 
+from _log_cache import DELTA_TYPECODE, map_logs, split_test_deltas
+from _reporting import DeltaStats, buffered_output
+
 def extract_measurements_by_battery_type():
     """Extract measurements from AA and AAA test files separately"""
     
     # AA measurements (from aa_ test files - these are actual AA batteries)
-    aa_correct_deltas = []      # AA batteries correctly detected as AA
-    aa_misdetected_deltas = []  # AA batteries incorrectly detected as AAA
+    aa_correct_deltas = array(DELTA_TYPECODE)      # AA batteries correctly detected as AA
+    aa_misdetected_deltas = array(DELTA_TYPECODE)  # AA batteries incorrectly detected as AAA
     
     # AAA measurements (from aaa_ test files - these are actual AAA batteries)  
-    aaa_correct_deltas = []     # AAA batteries correctly detected as AAA
-    aaa_misdetected_deltas = [] # AAA batteries incorrectly detected as AA
+    aaa_correct_deltas = array(DELTA_TYPECODE)     # AAA batteries correctly detected as AAA
+    aaa_misdetected_deltas = array(DELTA_TYPECODE) # AAA batteries incorrectly detected as AA
     
-    log_files = []
+    # Tag every test file with its battery type while listing the directory,
+    # then parse them all in a single pass with the output buffers picked per tag
+    log_count = 0
+    files = []
     if os.path.exists("logs"):
-        for filename in os.listdir("logs"):
-            if filename.endswith('.log'):
-                log_files.append(os.path.join("logs", filename))
-    
-    print(f"📁 Found {len(log_files)} log files")
+        with os.scandir("logs") as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.log'):
+                    log_count += 1
+                    # Classified by name alone; other logs are never opened
+                    if 'aa_' in entry.name and 'aaa_' not in entry.name:
+                        files.append((entry.path, 'aa', entry.stat()))
+                    elif 'aaa_' in entry.name:
+                        files.append((entry.path, 'aaa', entry.stat()))
     
-    aa_files = []
-    aaa_files = []
+    print(f"📁 Found {log_count} log files")
     
-    for log_file in log_files:
-        filename = os.path.basename(log_file)
-        if 'aa_' in filename and 'aaa_' not in filename:
-            aa_files.append(log_file)
-        elif 'aaa_' in filename:
-            aaa_files.append(log_file)
+    aa_file_count = sum(1 for _, battery, _ in files if battery == 'aa')
+    print(f"📊 AA test files: {aa_file_count}")
+    print(f"📊 AAA test files: {len(files) - aa_file_count}")
     
-    print(f"📊 AA test files: {len(aa_files)}")
-    print(f"📊 AAA test files: {len(aaa_files)}")
+    targets = {
+        'aa': (aa_correct_deltas, aa_misdetected_deltas),
+        'aaa': (aaa_correct_deltas, aaa_misdetected_deltas),
+    }
     
-    # Process AA test files (actual AA batteries)
     print(f"\n🔋 Processing AA battery test files...")
-    for log_file in aa_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-            
-            pattern = r'(✅|🚨)\s+SLOT\s+\d+:\s+(KLVR-AA|KLVR-AAA)\s+\|\s+AAA_ON=\d+mV\s+\|\s+AAA_OFF=\d+mV\s+\|\s+Δ=\s*(-?\d+)mV'
-            
-            for match in re.finditer(pattern, content):
-                status = match.group(1)
-                detected_type = match.group(2)
-                delta = int(match.group(3))
-                
-                if detected_type == 'KLVR-AA':
-                    aa_correct_deltas.append(delta)  # Correct AA detection
-                else:  # detected_type == 'KLVR-AAA'
-                    aa_misdetected_deltas.append(delta)  # AA misdetected as AAA
-                    
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-    
-    # Process AAA test files (actual AAA batteries)
     print(f"🔋 Processing AAA battery test files...")
-    for log_file in aaa_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-            
-            pattern = r'(✅|🚨)\s+SLOT\s+\d+:\s+(KLVR-AA|KLVR-AAA)\s+\|\s+AAA_ON=\d+mV\s+\|\s+AAA_OFF=\d+mV\s+\|\s+Δ=\s*(-?\d+)mV'
-            
-            for match in re.finditer(pattern, content):
-                status = match.group(1)
-                detected_type = match.group(2)
-                delta = int(match.group(3))
-                
-                if detected_type == 'KLVR-AAA':
-                    aaa_correct_deltas.append(delta)  # Correct AAA detection
-                else:  # detected_type == 'KLVR-AA'
-                    aaa_misdetected_deltas.append(delta)  # AAA misdetected as AA
-                    
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
+    for (_, battery, _), (file_correct, file_misdetected, message) in zip(
+            files, map_logs(split_test_deltas, files)):
+        if message:
+            print(message)
+        correct, misdetected = targets[battery]
+        correct.extend(file_correct)
+        misdetected.extend(file_misdetected)
     
     return aa_correct_deltas, aa_misdetected_deltas, aaa_correct_deltas, aaa_misdetected_deltas
 
-def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected):
+def _distribution_rows(values_sorted, ranges):
+    """Format the non-empty [min_val, max_val) buckets of a sorted series"""
+    total = len(values_sorted)
+    counts = [(min_val, max_val, label,
+               bisect_left(values_sorted, max_val) - bisect_left(values_sorted, min_val))
+              for min_val, max_val, label in ranges]
+    return [f"  {label:15} ({min_val:3d} to {max_val:3d}mV): {count:8,} ({count / total * 100:5.1f}%)"
+            for min_val, max_val, label, count in counts if count > 0]
+
+def summarize_battery_types(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected):
+    """Return a DeltaStats per non-empty series, keyed 'aa', 'aaa', 'aa_mis', 'aaa_mis'.
+
+    Each summary holds a sorted copy; the input buffers keep their original
+    order for the mode.
+    """
+    series = {'aa': aa_correct, 'aaa': aaa_correct,
+              'aa_mis': aa_misdetected, 'aaa_mis': aaa_misdetected}
+    return {name: DeltaStats.from_sorted(array(DELTA_TYPECODE, sorted(values)))
+            for name, values in series.items() if values}
+
+@buffered_output
+def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected, stats):
     """Analyze the ranges for each battery type based on correct detections"""
     
     print(f"\n🔬 PROPER DUAL RANGE ANALYSIS")
@@ -101,11 +96,12 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
         print(f"\n📊 ACTUAL AA BATTERY RANGE (Real AA Batteries)")
         print(f"-" * 50)
         
-        aa_mean = statistics.mean(aa_correct)
-        aa_median = statistics.median(aa_correct)
-        aa_mode = statistics.mode(aa_correct)
-        aa_std = statistics.stdev(aa_correct) if len(aa_correct) > 1 else 0
-        aa_min, aa_max = min(aa_correct), max(aa_correct)
+        # Mode ties go to the first-seen value, as with statistics.mode
+        aa_stats = stats['aa']
+        aa_sorted = aa_stats.sorted
+        aa_mean, aa_std, aa_median = aa_stats.mean, aa_stats.std, aa_stats.median
+        aa_mode = Counter(aa_correct).most_common(1)[0][0]
+        aa_min, aa_max = aa_stats.min, aa_stats.max
         
         print(f"Total measurements: {len(aa_correct):,}")
         print(f"Range: {aa_min}mV to {aa_max}mV")
@@ -115,14 +111,8 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
         print(f"Std Dev: {aa_std:.1f}mV")
         
         # Percentiles
-        aa_sorted = sorted(aa_correct)
-        percentiles = [1, 5, 10, 25, 50, 75, 90, 95, 99]
         print(f"\nPercentiles:")
-        for p in percentiles:
-            idx = int(p/100 * len(aa_sorted))
-            if idx >= len(aa_sorted):
-                idx = len(aa_sorted) - 1
-            value = aa_sorted[idx]
+        for p, value in aa_stats.percentiles.items():
             print(f"  {p:2d}th: {value:4d}mV")
         
         # Distribution analysis
@@ -136,23 +126,22 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
             (50, 100, "Large Positive")
         ]
         
+        # [min_val, max_val) bucket counts straight from the sorted copy
         print(f"\nDistribution:")
-        for min_val, max_val, label in ranges:
-            count = len([d for d in aa_correct if min_val <= d < max_val])
-            if count > 0:
-                percentage = count / len(aa_correct) * 100
-                print(f"  {label:15} ({min_val:3d} to {max_val:3d}mV): {count:8,} ({percentage:5.1f}%)")
+        rows = _distribution_rows(aa_sorted, ranges)
+        if rows:
+            print('\n'.join(rows))
     
     # Analyze AAA battery delta range (should be ~300mV)
     if aaa_correct:
         print(f"\n📊 ACTUAL AAA BATTERY RANGE (Real AAA Batteries)")
         print(f"-" * 50)
         
-        aaa_mean = statistics.mean(aaa_correct)
-        aaa_median = statistics.median(aaa_correct)
-        aaa_mode = statistics.mode(aaa_correct) if aaa_correct else 0
-        aaa_std = statistics.stdev(aaa_correct) if len(aaa_correct) > 1 else 0
-        aaa_min, aaa_max = min(aaa_correct), max(aaa_correct)
+        aaa_stats = stats['aaa']
+        aaa_sorted = aaa_stats.sorted
+        aaa_mean, aaa_std, aaa_median = aaa_stats.mean, aaa_stats.std, aaa_stats.median
+        aaa_mode = Counter(aaa_correct).most_common(1)[0][0]
+        aaa_min, aaa_max = aaa_stats.min, aaa_stats.max
         
         print(f"Total measurements: {len(aaa_correct):,}")
         print(f"Range: {aaa_min}mV to {aaa_max}mV")
@@ -162,13 +151,8 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
         print(f"Std Dev: {aaa_std:.1f}mV")
         
         # Percentiles
-        aaa_sorted = sorted(aaa_correct)
         print(f"\nPercentiles:")
-        for p in percentiles:
-            idx = int(p/100 * len(aaa_sorted))
-            if idx >= len(aaa_sorted):
-                idx = len(aaa_sorted) - 1
-            value = aaa_sorted[idx]
+        for p, value in aaa_stats.percentiles.items():
             print(f"  {p:2d}th: {value:4d}mV")
         
         # Distribution analysis around 300mV
@@ -184,11 +168,9 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
         ]
         
         print(f"\nDistribution:")
-        for min_val, max_val, label in aaa_ranges:
-            count = len([d for d in aaa_correct if min_val <= d < max_val])
-            if count > 0:
-                percentage = count / len(aaa_correct) * 100
-                print(f"  {label:15} ({min_val:3d} to {max_val:3d}mV): {count:8,} ({percentage:5.1f}%)")
+        rows = _distribution_rows(aaa_sorted, aaa_ranges)
+        if rows:
+            print('\n'.join(rows))
     else:
         print(f"\n⚠️  NO AAA BATTERY DATA FOUND")
         print(f"This means we only have AA test data, no actual AAA test data")
@@ -198,19 +180,20 @@ def analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_mis
         print(f"\n🚨 AA MISDETECTIONS (AA batteries detected as AAA)")
         print(f"-" * 50)
         print(f"Count: {len(aa_misdetected):,}")
-        print(f"Range: {min(aa_misdetected)}mV to {max(aa_misdetected)}mV")
-        print(f"Mean: {statistics.mean(aa_misdetected):.1f}mV")
+        print(f"Range: {stats['aa_mis'].min}mV to {stats['aa_mis'].max}mV")
+        print(f"Mean: {stats['aa_mis'].mean:.1f}mV")
         print(f"These deltas caused AA batteries to be misidentified as AAA")
     
     if aaa_misdetected:
         print(f"\n🚨 AAA MISDETECTIONS (AAA batteries detected as AA)")
         print(f"-" * 50)
         print(f"Count: {len(aaa_misdetected):,}")
-        print(f"Range: {min(aaa_misdetected)}mV to {max(aaa_misdetected)}mV")
-        print(f"Mean: {statistics.mean(aaa_misdetected):.1f}mV")
+        print(f"Range: {stats['aaa_mis'].min}mV to {stats['aaa_mis'].max}mV")
+        print(f"Mean: {stats['aaa_mis'].mean:.1f}mV")
         print(f"These deltas caused AAA batteries to be misidentified as AA")
 
-def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected):
+@buffered_output
+def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected, stats):
     """Recommend optimal dual ranges based on actual battery type data"""
     
     print(f"\n🎯 OPTIMAL DUAL RANGE RECOMMENDATIONS")
@@ -220,18 +203,15 @@ def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_m
         print("❌ No AA battery data available")
         return
     
-    # Calculate AA range based on actual AA batteries
-    aa_sorted = sorted(aa_correct)
-    aa_mean = statistics.mean(aa_correct)
-    aa_std = statistics.stdev(aa_correct)
+    # Calculate AA range based on actual AA batteries, reusing the sorted
+    # copy from the analysis
+    aa_stats = stats['aa']
+    aa_sorted = aa_stats.sorted
     
     # Different coverage options for AA
-    aa_90_lower = aa_sorted[int(0.05 * len(aa_sorted))]
-    aa_90_upper = aa_sorted[int(0.95 * len(aa_sorted))]
-    aa_95_lower = aa_sorted[int(0.025 * len(aa_sorted))]
-    aa_95_upper = aa_sorted[int(0.975 * len(aa_sorted))]
-    aa_99_lower = aa_sorted[int(0.005 * len(aa_sorted))]
-    aa_99_upper = aa_sorted[int(0.995 * len(aa_sorted))]
+    aa_90_lower, aa_90_upper = aa_stats.percentile(5), aa_stats.percentile(95)
+    aa_95_lower, aa_95_upper = aa_stats.percentile(2.5), aa_stats.percentile(97.5)
+    aa_99_lower, aa_99_upper = aa_stats.percentile(0.5), aa_stats.percentile(99.5)
     
     print(f"\n📊 AA RANGE OPTIONS (Based on Real AA Batteries):")
     print(f"90% coverage: {aa_90_lower}mV to {aa_90_upper}mV")
@@ -240,16 +220,12 @@ def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_m
     
     # Calculate AAA range based on actual AAA batteries (if available)
     if aaa_correct:
-        aaa_sorted = sorted(aaa_correct)
-        aaa_mean = statistics.mean(aaa_correct)
-        aaa_std = statistics.stdev(aaa_correct)
+        aaa_stats = stats['aaa']
+        aaa_sorted = aaa_stats.sorted
         
-        aaa_90_lower = aaa_sorted[int(0.05 * len(aaa_sorted))]
-        aaa_90_upper = aaa_sorted[int(0.95 * len(aaa_sorted))]
-        aaa_95_lower = aaa_sorted[int(0.025 * len(aaa_sorted))]
-        aaa_95_upper = aaa_sorted[int(0.975 * len(aaa_sorted))]
-        aaa_99_lower = aaa_sorted[int(0.005 * len(aaa_sorted))]
-        aaa_99_upper = aaa_sorted[int(0.995 * len(aaa_sorted))]
+        aaa_90_lower, aaa_90_upper = aaa_stats.percentile(5), aaa_stats.percentile(95)
+        aaa_95_lower, aaa_95_upper = aaa_stats.percentile(2.5), aaa_stats.percentile(97.5)
+        aaa_99_lower, aaa_99_upper = aaa_stats.percentile(0.5), aaa_stats.percentile(99.5)
         
         print(f"\n📊 AAA RANGE OPTIONS (Based on Real AAA Batteries):")
         print(f"90% coverage: {aaa_90_lower}mV to {aaa_90_upper}mV")
@@ -275,8 +251,7 @@ def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_m
         print(f"\n⚠️  NO AAA DATA - Using AA misdetection pattern for AAA range")
         if aa_misdetected:
             # Use misdetection data as proxy for AAA range
-            aaa_proxy_mean = statistics.mean(aa_misdetected)
-            aaa_proxy_std = statistics.stdev(aa_misdetected)
+            aaa_proxy_mean, aaa_proxy_std = stats['aa_mis'].mean, stats['aa_mis'].std
             
             recommended_aaa_min = int(aaa_proxy_mean - aaa_proxy_std)
             recommended_aaa_max = int(aaa_proxy_mean + aaa_proxy_std)
@@ -300,12 +275,14 @@ def recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_m
     
     # Performance estimation
     if aa_correct:
-        aa_lost = len([d for d in aa_correct if d < recommended_aa_min or d > recommended_aa_max])
+        aa_lost = (bisect_left(aa_sorted, recommended_aa_min)
+                   + len(aa_sorted) - bisect_right(aa_sorted, recommended_aa_max))
         aa_coverage = (len(aa_correct) - aa_lost) / len(aa_correct) * 100
         print(f"\nExpected AA coverage: {aa_coverage:.1f}% ({len(aa_correct) - aa_lost:,}/{len(aa_correct):,})")
     
     if aaa_correct:
-        aaa_lost = len([d for d in aaa_correct if d < recommended_aaa_min or d > recommended_aaa_max])
+        aaa_lost = (bisect_left(aaa_sorted, recommended_aaa_min)
+                    + len(aaa_sorted) - bisect_right(aaa_sorted, recommended_aaa_max))
         aaa_coverage = (len(aaa_correct) - aaa_lost) / len(aaa_correct) * 100
         print(f"Expected AAA coverage: {aaa_coverage:.1f}% ({len(aaa_correct) - aaa_lost:,}/{len(aaa_correct):,})")
 
@@ -317,11 +294,14 @@ def main():
     # Extract measurements by actual battery type
     aa_correct, aa_misdetected, aaa_correct, aaa_misdetected = extract_measurements_by_battery_type()
     
+    # Summarize every series once; analysis and recommendations share it
+    stats = summarize_battery_types(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected)
+    
     # Analyze each battery type separately
-    analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected)
+    analyze_battery_type_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected, stats)
     
     # Generate optimal recommendations
-    recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected)
+    recommend_optimal_dual_ranges(aa_correct, aa_misdetected, aaa_correct, aaa_misdetected, stats)
 
 if __name__ == "__main__":
     main()
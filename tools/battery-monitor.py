@@ -23,31 +23,50 @@ DIAGNOSTIC ENHANCEMENTS (beta31+):
   - Enhanced debugging: Identify measurement consistency issues
   - Maintained ranges: AA (-50 to +50mV), AAA (280-380mV)
 
-Usage: python3 tools/battery-monitor.py [IP_ADDRESS|FULL_URL] [TEST_TYPE]
+Usage: python3 tools/battery-monitor.py [IP_ADDRESS|FULL_URL] [TEST_TYPE] [OPTIONS]
 
 TEST_TYPE options:
   aa    - Test AA battery detection (highlights misdetections as AAA)
   aaa   - Test AAA battery detection (highlights failures to detect)
   both  - Monitor both types (default)
 
+OPTIONS:
+  --targets HOST,HOST     Monitor several chargers at once (one log file each)
+  --min-interval SECONDS  Poll interval while readings change (default 0.7)
+  --max-interval SECONDS  Longest back-off while idle or unreachable (default 5.0)
+
 Examples:
   python3 tools/battery-monitor.py 10.110.73.155 aa
   python3 tools/battery-monitor.py 10.110.73.155 aaa
   python3 tools/battery-monitor.py 10.110.73.155 both
 
+Several chargers at once:
+  python3 tools/battery-monitor.py --targets 10.110.73.155,10.110.73.156 aa
+
 With a tunneled URL (e.g., via Cloudflare Tunnel or SSH reverse proxy):
   python3 tools/battery-monitor.py https://abcd-1234.trycloudflare.com aa
 
 """
 
-import json
-import urllib.request
-import time
+import argparse
+import asyncio
+import gzip
+import http.client
 import sys
 import os
+import signal
+import threading
+import time
 from datetime import datetime
 from urllib.parse import urlparse
 
+# orjson parses the response bytes directly and is several times faster;
+# the stdlib parser is the fallback and also accepts bytes
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 def build_base_url(target: str) -> str:
     """Build base URL from an IP/host or a full URL.
 
@@ -71,99 +90,308 @@ def build_base_url(target: str) -> str:
     return f"http://{target}:8000"
 
 
-def get_charger_status(base_url: str):
-    """Fetch charger status from the API"""
-    try:
-        url = f"{base_url}/api/v2/charger/status"
-        with urllib.request.urlopen(url, timeout=5) as response:
-            return json.loads(response.read().decode())
-    except Exception as e:
-        return None
+# One keep-alive connection per charger origin, reused across polls so each
+# reading skips the TCP (and, for tunnelled HTTPS, TLS) handshake.
+_connections = {}
+
+# The per-slot debug JSON compresses well, which matters on slow tunnels
+_REQUEST_HEADERS = {"Accept-Encoding": "gzip"}
+
+# Last (etag, body, data) seen per charger. Slot state changes far less often
+# than we poll, so an unchanged reply hands back the previous data object and
+# the caller can reuse its analysis instead of redoing it.
+_last_status = {}
+
+# Attempts per status poll, and the delay before the first retry (doubling
+# on each further retry)
+_STATUS_ATTEMPTS = 3
+_RETRY_BACKOFF = 0.1
+
+# Set once the monitor is stopping, so request threads skip further retries
+_stopping = threading.Event()
+
+
+def _get_connection(base_url: str) -> http.client.HTTPConnection:
+    conn = _connections.get(base_url)
+    if conn is None:
+        parsed = urlparse(base_url)
+        conn_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        conn = conn_class(parsed.netloc, timeout=5)
+        _connections[base_url] = conn
+    return conn
+
+
+def _drop_connection(base_url: str):
+    conn = _connections.pop(base_url, None)
+    if conn is not None:
+        conn.close()
+
+
+def get_charger_status(base_url: str, attempts=_STATUS_ATTEMPTS):
+    """Fetch charger status from the API
+
+    Network errors and 5xx replies are retried up to `attempts` times in
+    total with a short exponential backoff, so a dropped request does not
+    cost a reading; 4xx replies and unparseable bodies fail immediately.
+
+    Returns the very same object as the previous call when the charger
+    reports the status unchanged (304 Not Modified or an identical body).
+    """
+    for attempt in range(attempts):
+        if attempt and _stopping.wait(_RETRY_BACKOFF * 2 ** (attempt - 1)):
+            return None
+        try:
+            last = _last_status.get(base_url)
+            headers = _REQUEST_HEADERS
+            if last and last[0]:
+                headers = {**headers, "If-None-Match": last[0]}
+
+            conn = _get_connection(base_url)
+            conn.request("GET", "/api/v2/charger/status", headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status == 304 and last:
+                return last[2]
+            if response.status >= 500:
+                continue
+            if response.status != 200:
+                return None
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+
+            if last and body == last[1]:
+                data = last[2]
+            else:
+                data = _json.loads(body)
+            _last_status[base_url] = (response.getheader("ETag"), body, data)
+            return data
+        except (http.client.HTTPException, OSError):
+            # Includes timeouts and a keep-alive socket the charger closed
+            # while we slept; retry on a fresh connection
+            _drop_connection(base_url)
+        except Exception as e:
+            _drop_connection(base_url)
+            return None
+    return None
+
+# Detection class bits for a batteryDetected string; the values double as
+# indexes into per-class tables (0 = neither AA nor AAA)
+_DET_AA = 0b01
+_DET_AAA = 0b10
+
+class _DetectionBits(dict):
+    """detected type -> _DET_* bits, classified and memoized on first sight"""
+    def __missing__(self, detected_type):
+        bits = self[detected_type] = (_DET_AAA if 'AAA' in detected_type
+                                      else _DET_AA if 'AA' in detected_type else 0)
+        return bits
+
+# Chargers only ever report a handful of distinct type strings, so after the
+# first poll every lookup is a plain dict hit
+_DET_BITS = _DetectionBits()
 
 def analyze_detection(data, test_type='both'):
     """Analyze battery detection results based on test type"""
     if not data or 'batteries' not in data:
         return None
     
-    active_batteries = [b for b in data['batteries'] if b['slotState'] != 'empty']
-    aa_count = len([b for b in active_batteries if 'AA' in b['batteryDetected'] and 'AAA' not in b['batteryDetected']])
-    aaa_count = len([b for b in active_batteries if 'AAA' in b['batteryDetected']])
-    
-    # Collect debug info for all active batteries
+    # Single pass over the slots: counts, debug info and classification
+    # are all accumulated together
+    counts = [0, 0, 0]  # active slots per detection bits
+    retry_count = 0  # slots that required retries
     all_debug_info = []
     misdetections = []
     correct_detections = []
     
+    # Resolve the test type once: pick which list (if any) receives an AAA,
+    # an AA and any other detection, indexed by detection bits, so the loop
+    # below never branches on it
+    if test_type == 'aa':
+        # Testing AA batteries - flag if detected as AAA (misdetection)
+        buckets = (None, correct_detections, misdetections)
+    elif test_type == 'aaa':
+        # Testing AAA batteries - flag if NOT detected as AAA (failure)
+        buckets = (misdetections, misdetections, correct_detections)
+    else:
+        buckets = (None, None, None)
+    
     for i, battery in enumerate(data['batteries']):
-        if battery['slotState'] != 'empty':
-            detected_type = battery['batteryDetected']
-            
-            if 'debug' in battery:
-                debug = battery['debug']
-                debug_entry = {
-                    'slot': i,
-                    'detected_type': detected_type,
-                    'voltageAAA_mv': debug.get('voltageAAA_mv', 0),
-                    'voltageAA_mv': debug.get('voltageAA_mv', 0), 
-                    'voltageDelta_mv': debug.get('voltageDelta_mv', 0),
-                    'lastDetection_ms': debug.get('lastDetection_ms', 0),
-                    'retryCount': debug.get('retryCount', 0),
-                    'medianCycleSelected': debug.get('medianCycleSelected', 0)
-                }
-                all_debug_info.append(debug_entry)
-                
-                # Analyze based on test type
-                if test_type == 'aa':
-                    # Testing AA batteries - flag if detected as AAA (misdetection)
-                    if 'AAA' in detected_type:
-                        misdetections.append(debug_entry)
-                    elif 'AA' in detected_type and 'AAA' not in detected_type:
-                        correct_detections.append(debug_entry)
-                        
-                elif test_type == 'aaa':
-                    # Testing AAA batteries - flag if NOT detected as AAA (failure)
-                    if 'AAA' not in detected_type:
-                        misdetections.append(debug_entry)
-                    else:
-                        correct_detections.append(debug_entry)
+        if battery['slotState'] == 'empty':
+            continue
+        detected_type = battery['batteryDetected']
+        bits = _DET_BITS[detected_type]
+        counts[bits] += 1
+        bucket = buckets[bits]
+        
+        debug = battery.get('debug')
+        if debug is not None:
+            debug_entry = {
+                'slot': i,
+                'detected_type': detected_type,
+                'voltageAAA_mv': debug.get('voltageAAA_mv', 0),
+                'voltageAA_mv': debug.get('voltageAA_mv', 0), 
+                'voltageDelta_mv': debug.get('voltageDelta_mv', 0),
+                'lastDetection_ms': debug.get('lastDetection_ms', 0),
+                'retryCount': debug.get('retryCount', 0),
+                'medianCycleSelected': debug.get('medianCycleSelected', 0)
+            }
+            all_debug_info.append(debug_entry)
+            if debug_entry['retryCount'] > 0:
+                retry_count += 1
+            if bucket is not None:
+                bucket.append(debug_entry)
     
     return {
-        'total': len(active_batteries),
-        'aa_count': aa_count,
-        'aaa_count': aaa_count,
+        'total': sum(counts),
+        'aa_count': counts[_DET_AA],
+        'aaa_count': counts[_DET_AAA],
         'all_debug_info': all_debug_info,
         'misdetections': misdetections,
         'correct_detections': correct_detections,
+        'misdetection_count': len(misdetections),
+        'correct_count': len(correct_detections),
+        'retry_count': retry_count,
         'test_type': test_type
     }
 
-def format_detection_line(reading_num, analysis):
-    """Format a detection result line based on test type"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
+# Per test type: summary line template plus the status shown when every slot
+# is correct / when something was misdetected. _main() picks one at startup.
+_LINE_FORMATS = {
+    # AA test mode - focus on AA misdetections
+    'aa': ("#{n:3d} {ts} | [AA TEST] Total: {total:2d} | Correct AA: {correct:2d} | Misdetected as AAA: {mis:2d} | Retries: {retries} | {status}",
+           "✅ All correct", "🚨 MISDETECTION!"),
+    # AAA test mode - focus on AAA detection failures
+    'aaa': ("#{n:3d} {ts} | [AAA TEST] Total: {total:2d} | Detected AAA: {correct:2d} | Failed to detect: {mis:2d} | Retries: {retries} | {status}",
+            "✅ All detected", "🚨 DETECTION FAILED!"),
+    # Both mode - general monitoring
+    'both': ("#{n:3d} {ts} | [BOTH] Total: {total:2d} | AA: {aa:2d} | AAA: {aaa:2d}", "", ""),
+}
+
+def _now_hms():
+    """Wall-clock HH:MM:SS for reading lines, without building a datetime"""
+    return time.strftime("%H:%M:%S", time.localtime())
+
+def format_detection_line(reading_num, analysis, line_format, timestamp):
+    """Format a detection result line using the test type's _LINE_FORMATS entry"""
     if not analysis:
         return f"#{reading_num:3d} {timestamp} | ❌ Connection failed"
     
-    test_type = analysis.get('test_type', 'both')
-    misdetection_count = len(analysis['misdetections'])
-    correct_count = len(analysis['correct_detections'])
+    template, ok_status, alert_status = line_format
+    misdetection_count = analysis['misdetection_count']
+    return template.format_map({
+        'n': reading_num,
+        'ts': timestamp,
+        'total': analysis['total'],
+        'aa': analysis['aa_count'],
+        'aaa': analysis['aaa_count'],
+        'correct': analysis['correct_count'],
+        'mis': misdetection_count,
+        # Slots that required retries (always shown, even if 0)
+        'retries': analysis['retry_count'],
+        'status': alert_status if misdetection_count > 0 else ok_status,
+    })
+
+# Voltage dump highlight per test type, indexed by detection bits
+# (neither, AA, AAA)
+_INDICATORS = {
+    'aa': ("✅", "✅", "🚨"),
+    'aaa': ("🚨", "🚨", "✅"),
+    'both': ("📊", "📊", "📊"),
+}
+
+# Per-slot line templates, filled straight from a debug entry with
+# format_map(). The voltage dump's indicator is prepended by the caller.
+# Updated for beta31 dual median filtering system:
+# - voltageAAA_mv: Median AAA_ON baseline (from 3 measurements)
+# - voltageAA_mv: Calculated AAA_OFF (baseline - median_delta)
+# - voltageDelta_mv: Median delta (from 3 AAA_OFF measurements)
+# - medianCycleSelected: Which measurement provided the median delta
+_VOLT_TMPL = " SLOT {slot:2d}: {detected_type:8} | AAA_ON={voltageAAA_mv:4d}mV | AAA_OFF={voltageAA_mv:4d}mV | Δ={voltageDelta_mv:4d}mV"
+_DETAIL_TMPL = "    🔬 SLOT {slot} DETAILS: Detected={detected_type} | AAA_ON={voltageAAA_mv}mV | AAA_OFF={voltageAA_mv}mV | Δ={voltageDelta_mv}mV"
+
+# Misdetection alert per test type, filled with the misdetection count
+_ALERT_TMPL = {
+    'aa': "    🚨🚨 AA MISDETECTION ALERT! {} AA batteries detected as AAA!",
+    'aaa': "    🚨🚨 AAA DETECTION FAILURE! {} AAA batteries not detected!",
+    'both': "    🚨🚨 DETECTION ISSUE! {} problematic detections!",
+}
+
+def _extra_info(debug):
+    """Optional retry/median-cycle suffix shared by the per-slot lines"""
+    retry_info = " | Retries=" + str(debug['retryCount']) if debug['retryCount'] > 0 else ""
+    median_info = " | Cycle=" + str(debug['medianCycleSelected']) if debug['medianCycleSelected'] > 0 else ""
+    return retry_info + median_info
+
+# Console voltage dumps skip a slot whose type is unchanged and whose
+# voltages all moved less than this since it was last shown; every
+# _FULL_DUMP_EVERY readings the dump shows every slot regardless
+_DUMP_THRESHOLD_MV = 20
+_FULL_DUMP_EVERY = 100
+
+def _slot_changed(shown, debug):
+    """Whether a slot differs enough from its last shown entry to show again"""
+    return (debug['detected_type'] != shown['detected_type']
+            or abs(debug['voltageAAA_mv'] - shown['voltageAAA_mv']) >= _DUMP_THRESHOLD_MV
+            or abs(debug['voltageAA_mv'] - shown['voltageAA_mv']) >= _DUMP_THRESHOLD_MV
+            or abs(debug['voltageDelta_mv'] - shown['voltageDelta_mv']) >= _DUMP_THRESHOLD_MV)
+
+def format_voltage_line(indicator, debug):
+    """Format the fixed-width voltage dump line for one slot"""
+    return "    " + indicator + _VOLT_TMPL.format_map(debug) + _extra_info(debug)
+
+def format_detail_line(debug):
+    """Format the detail line printed for each misdetected slot"""
+    return _DETAIL_TMPL.format_map(debug) + _extra_info(debug)
+
+# Poll back-off: growth factor per unchanged reading, and the first delay
+# after a failed request (doubling on each further failure)
+_IDLE_BACKOFF = 1.5
+_FAILURE_BACKOFF = 1.0
+
+# Longest a reading may sit in the log buffer when nothing is misdetected
+_LOG_FLUSH_SECONDS = 1.0
+_LOG_BUFFER_SIZE = 64 * 1024
+_LOG_HEADER_RULE = ("=" * 60 + "\n\n").encode()
+
+class LazyLog:
+    """Binary log file that is only created, header first, once there is data
+
+    Stopping the monitor before the charger has answered leaves no log (or
+    logs directory) behind. Writes made with create=False, such as failed
+    readings, are held in memory until the file is created. Data is written
+    as UTF-8 bytes through a large buffer, skipping the text layer's encoder
+    and newline handling.
+    """
+    def __init__(self, path, header=b""):
+        self.path = path
+        self.header = header
+        self._file = None
+        self._pending = []
     
-    # Count slots that required retries
-    retry_count = len([d for d in analysis['all_debug_info'] if d['retryCount'] > 0])
-    retry_info = f" | Retries: {retry_count}"  # Always show retry count, even if 0
+    def write(self, data, create=True):
+        if self._file is None:
+            if not create:
+                self._pending.append(data)
+                return
+            # Create logs directory if it doesn't exist
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, 'wb', buffering=_LOG_BUFFER_SIZE)
+            self._file.write(self.header)
+            self._file.write(b"".join(self._pending))
+            self._pending = None
+        self._file.write(data)
     
-    if test_type == 'aa':
-        # AA test mode - focus on AA misdetections
-        status = "🚨 MISDETECTION!" if misdetection_count > 0 else "✅ All correct"
-        return f"#{reading_num:3d} {timestamp} | [AA TEST] Total: {analysis['total']:2d} | Correct AA: {correct_count:2d} | Misdetected as AAA: {misdetection_count:2d}{retry_info} | {status}"
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
     
-    elif test_type == 'aaa':
-        # AAA test mode - focus on AAA detection failures  
-        status = "🚨 DETECTION FAILED!" if misdetection_count > 0 else "✅ All detected"
-        return f"#{reading_num:3d} {timestamp} | [AAA TEST] Total: {analysis['total']:2d} | Detected AAA: {correct_count:2d} | Failed to detect: {misdetection_count:2d}{retry_info} | {status}"
+    def __enter__(self):
+        return self
     
-    else:
-        # Both mode - general monitoring
-        return f"#{reading_num:3d} {timestamp} | [BOTH] Total: {analysis['total']:2d} | AA: {analysis['aa_count']:2d} | AAA: {analysis['aaa_count']:2d}"
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
 def get_test_mode():
     """Interactive prompt for test mode selection"""
@@ -191,12 +419,45 @@ def get_test_mode():
             sys.exit(0)
 
 def main():
-    target = sys.argv[1] if len(sys.argv) > 1 else "10.110.73.155"
-    base_url = build_base_url(target)
+    parser = argparse.ArgumentParser(description="Real-time AA/AAA battery detection monitor")
+    parser.add_argument("target", nargs="?", help="charger IP/host or full URL (default: 10.110.73.155)")
+    parser.add_argument("test_type", nargs="?", help="aa, aaa or both (prompted if omitted)")
+    parser.add_argument("--targets", help="comma-separated chargers to monitor concurrently, instead of TARGET")
+    parser.add_argument("--min-interval", type=float, default=0.7,  # Optimized for beta29 600ms true 3-cycle detection
+                        help="poll interval in seconds while readings change (default: %(default)s)")
+    parser.add_argument("--max-interval", type=float, default=5.0,
+                        help="longest back-off in seconds while idle or unreachable (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="stop after this many minutes (default: run until stopped)")
+    parser.add_argument("--export", default="txt",
+                        help="log format; only txt is written (accepted for the support CLIs)")
+    # Tolerate flags newer callers may pass, as the positional-only parser did
+    args, unknown = parser.parse_known_args()
+    if unknown:
+        print(f"⚠️  Ignoring unsupported arguments: {' '.join(unknown)}")
+    if args.min_interval <= 0 or args.max_interval <= 0:
+        parser.error("--min-interval and --max-interval must be positive")
+    if args.min_interval > args.max_interval:
+        parser.error("--min-interval must not exceed --max-interval")
+    if args.export != "txt":
+        print(f"⚠️  --export {args.export} is not supported; writing a txt log")
+    
+    if args.targets:
+        # With --targets a lone positional argument is the test type
+        if args.test_type is not None or (args.target is not None
+                                          and args.target.lower() not in ('aa', 'aaa', 'both')):
+            parser.error("give either TARGET or --targets, not both")
+        args.test_type, args.target = args.target, None
+        targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+        if not targets:
+            parser.error("--targets needs at least one charger")
+    else:
+        targets = [args.target or "10.110.73.155"]
+    base_urls = list(dict.fromkeys(build_base_url(t) for t in targets))
     
     # Get test type from command line or prompt
-    if len(sys.argv) > 2:
-        test_type = sys.argv[2].lower()
+    if args.test_type is not None:
+        test_type = args.test_type.lower()
         # Validate test type
         if test_type not in ['aa', 'aaa', 'both']:
             print("❌ Invalid test type. Use: aa, aaa, or both")
@@ -204,17 +465,62 @@ def main():
             sys.exit(1)
     else:
         test_type = get_test_mode()
+
+    try:
+        asyncio.run(_main(base_urls, test_type, args.min_interval, args.max_interval, args.duration * 60))
+    except KeyboardInterrupt:
+        # asyncio.run() re-raises Ctrl+C once the cancelled monitor has
+        # printed its summary
+        pass
+
+async def _in_daemon_thread(func, *args):
+    """Await func(*args) run on a daemon thread
+
+    Unlike asyncio.to_thread(), a request still in flight when the monitor
+    stops (a charger that never replies) does not hold up the exit.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
     
-    # Create logs directory if it doesn't exist
-    os.makedirs("logs", exist_ok=True)
+    def settle(result, error):
+        if future.cancelled():
+            return
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
     
-    # Create log file with timestamp and test type
-    log_filename = f"logs/detection_monitor_{test_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    def run():
+        try:
+            outcome = func(*args), None
+        except Exception as e:
+            outcome = None, e
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass  # The loop has already closed
+    
+    threading.Thread(target=run, daemon=True).start()
+    return await future
+
+async def _main(base_urls, test_type, min_interval, max_interval, duration=0):
+    # Name the log file with timestamp and test type, one per charger; with
+    # several chargers the host goes into the name and prefixes console lines
+    started = datetime.now().strftime('%Y%m%d_%H%M%S')
+    multiple = len(base_urls) > 1
+    log_filenames = {}
+    for base_url in base_urls:
+        if multiple:
+            host = urlparse(base_url).netloc.replace(":", "_")
+            log_filenames[base_url] = f"logs/detection_monitor_{test_type}_{host}_{started}.log"
+        else:
+            log_filenames[base_url] = f"logs/detection_monitor_{test_type}_{started}.log"
     
     print("\n" + "=" * 60)
     print("🔋 KLVR Charger - Focused Battery Detection Monitor")
     print("=" * 60)
-    print(f"📍 Endpoint: {base_url}")
+    for base_url in base_urls:
+        print(f"📍 Endpoint: {base_url}")
     print(f"🎯 Test Mode: {test_type.upper()}")
     if test_type == 'aa':
         print("   → Testing AA batteries - Will highlight any misdetections as AAA")
@@ -224,90 +530,147 @@ def main():
         print("   → Insert ONLY AAA batteries for clean test data")
     else:
         print("   → Monitoring both types - General detection monitoring")
-    print(f"📝 Log file: {log_filename}")
+    for log_filename in log_filenames.values():
+        print(f"📝 Log file: {log_filename}")
     print("⚡ Press Ctrl+C to stop monitoring")
     print("=" * 60)
     print("")
     
+    readings = dict.fromkeys(base_urls, 0)
+    # The support CLIs stop the monitor with SIGTERM; treat it like Ctrl+C so
+    # the pollers unwind, the logs are closed (flushed) and the summary prints
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass  # No loop signal handlers on Windows
+    if duration > 0:
+        asyncio.get_running_loop().call_later(duration, asyncio.current_task().cancel)
+    try:
+        await asyncio.gather(*(
+            poll_charger(base_url, test_type, log_filenames[base_url], min_interval, max_interval,
+                         readings, f"[{urlparse(base_url).netloc}] " if multiple else "")
+            for base_url in base_urls
+        ))
+    except asyncio.CancelledError:
+        _stopping.set()
+        print("\n👋 Monitoring stopped")
+        for base_url, log_filename in log_filenames.items():
+            if multiple:
+                print(f"📍 {base_url}")
+            print(f"Total readings: {readings[base_url]}")
+            if os.path.exists(log_filename):
+                print(f"Log saved to: {log_filename}")
+            elif readings[base_url]:
+                print("No log written (charger never replied)")
+            else:
+                print("No log written (no readings)")
+
+async def poll_charger(base_url, test_type, log_filename, min_interval, max_interval, readings, console_prefix=""):
+    """Poll one charger until cancelled, printing and logging each reading
+
+    readings[base_url] always holds the number of completed readings.
+    """
+    line_format = _LINE_FORMATS[test_type]
+    indicators = _INDICATORS[test_type]
+    alert_tmpl = _ALERT_TMPL[test_type]
     reading_num = 1
+    idle_polls = 0
+    failed_polls = 0
+    last_data = None
     last_analysis = None
+    last_shown = {}  # slot -> debug entry last shown in a console voltage dump
     
-    try:
-        with open(log_filename, 'w') as log_file:
-            # Write header to log
-            log_file.write(f"KLVR Charger Detection Monitor - Started {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            log_file.write(f"Monitoring: {base_url}\n")
-            log_file.write("=" * 60 + "\n\n")
-            log_file.flush()
-            
-            while True:
-                data = get_charger_status(base_url)
+    header = (f"KLVR Charger Detection Monitor - Started {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+              f"Monitoring: {base_url}\n".encode() + _LOG_HEADER_RULE)
+    # Readings are scheduled on the loop's monotonic clock, measured from the
+    # start of each poll, so request and output time don't stretch the cadence
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    last_flush = None
+    with LazyLog(log_filename, header) as log_file:
+        while True:
+            # The blocking GET runs in a worker thread so the event loop
+            # stays free to handle Ctrl+C while the request is in flight
+            data = await _in_daemon_thread(get_charger_status, base_url)
+            if data is None or data is not last_data:
                 analysis = analyze_detection(data, test_type)
-                
-                # Always show current reading
-                line = format_detection_line(reading_num, analysis)
-                print(line)
-                log_file.write(line + "\n")
-                
-                # Show detailed voltage info for misdetections or every 10 readings
-                if analysis and analysis['all_debug_info'] and (reading_num % 10 == 1 or len(analysis['misdetections']) > 0):
-                    for debug in analysis['all_debug_info']:
-                        # Highlight based on test type
-                        if test_type == 'aa':
-                            indicator = "🚨" if 'AAA' in debug['detected_type'] else "✅"
-                        elif test_type == 'aaa':
-                            indicator = "✅" if 'AAA' in debug['detected_type'] else "🚨"
-                        else:
-                            indicator = "📊"
-                        
-                        retry_info = f" | Retries={debug['retryCount']}" if debug['retryCount'] > 0 else ""
-                        median_info = f" | Cycle={debug['medianCycleSelected']}" if debug['medianCycleSelected'] > 0 else ""
-                        # Updated for beta31 dual median filtering system:
-                        # - voltageAAA_mv: Median AAA_ON baseline (from 3 measurements)
-                        # - voltageAA_mv: Calculated AAA_OFF (baseline - median_delta)
-                        # - voltageDelta_mv: Median delta (from 3 AAA_OFF measurements)
-                        # - medianCycleSelected: Which measurement provided the median delta
-                        voltage_line = f"    {indicator} SLOT {debug['slot']:2d}: {debug['detected_type']:8} | AAA_ON={debug['voltageAAA_mv']:4d}mV | AAA_OFF={debug['voltageAA_mv']:4d}mV | Δ={debug['voltageDelta_mv']:4d}mV{retry_info}{median_info}"
-                        print(voltage_line)
-                        log_file.write(voltage_line + "\n")
-                
-                # Highlight misdetections immediately
-                if analysis and len(analysis['misdetections']) > 0:
-                    if test_type == 'aa':
-                        alert_msg = f"    🚨🚨 AA MISDETECTION ALERT! {len(analysis['misdetections'])} AA batteries detected as AAA!"
-                    elif test_type == 'aaa':
-                        alert_msg = f"    🚨🚨 AAA DETECTION FAILURE! {len(analysis['misdetections'])} AAA batteries not detected!"
+            else:
+                analysis = last_analysis
+            
+            # Collect every line for this reading, then emit them in one go
+            lines = [format_detection_line(reading_num, analysis, line_format, _now_hms())]
+            
+            # Show detailed voltage info for misdetections or every 10 readings.
+            # The log always gets every slot (the analysis scripts sample
+            # these lines); the console only repeats slots that changed since
+            # they were last shown, apart from a periodic full dump.
+            console_hidden = None
+            if analysis and analysis['all_debug_info'] and (reading_num % 10 == 1 or analysis['misdetection_count'] > 0):
+                full_dump = reading_num % _FULL_DUMP_EVERY == 1
+                for debug in analysis['all_debug_info']:
+                    shown = last_shown.get(debug['slot'])
+                    if full_dump or shown is None or _slot_changed(shown, debug):
+                        last_shown[debug['slot']] = debug
                     else:
-                        alert_msg = f"    🚨🚨 DETECTION ISSUE! {len(analysis['misdetections'])} problematic detections!"
-                    
-                    print(alert_msg)
-                    log_file.write(alert_msg + "\n")
-                    
-                    # Show detailed info for each misdetection
-                    for debug in analysis['misdetections']:
-                        retry_info = f" | Retries={debug['retryCount']}" if debug['retryCount'] > 0 else ""
-                        median_info = f" | Cycle={debug['medianCycleSelected']}" if debug['medianCycleSelected'] > 0 else ""
-                        # Updated for beta31: Dual median filtering (baseline + detection)
-                        detail_msg = f"    🔬 SLOT {debug['slot']} DETAILS: Detected={debug['detected_type']} | AAA_ON={debug['voltageAAA_mv']}mV | AAA_OFF={debug['voltageAA_mv']}mV | Δ={debug['voltageDelta_mv']}mV{retry_info}{median_info}"
-                        print(detail_msg)
-                        log_file.write(detail_msg + "\n")
-                
-                # Detect and highlight changes
-                if last_analysis and analysis:
-                    if analysis['total'] != last_analysis['total']:
-                        change_msg = f"    📥 BATTERY COUNT: {last_analysis['total']} → {analysis['total']}"
-                        print(change_msg)
-                        log_file.write(change_msg + "\n")
+                        if console_hidden is None:
+                            console_hidden = set()
+                        console_hidden.add(len(lines))
+                    lines.append(format_voltage_line(indicators[_DET_BITS[debug['detected_type']]], debug))
+            
+            # Highlight misdetections immediately
+            if analysis and analysis['misdetection_count'] > 0:
+                lines.append(alert_tmpl.format(analysis['misdetection_count']))
                 
-                log_file.flush()  # Ensure immediate write to disk
-                last_analysis = analysis
-                reading_num += 1
-                time.sleep(0.7)  # Optimized for beta29 600ms true 3-cycle detection
+                # Show detailed info for each misdetection
+                lines.extend(format_detail_line(debug) for debug in analysis['misdetections'])
             
-    except KeyboardInterrupt:
-        print("\n👋 Monitoring stopped")
-        print(f"Total readings: {reading_num - 1}")
-        print(f"Log saved to: {log_filename}")
+            # Detect and highlight changes
+            if last_analysis and analysis:
+                if analysis['total'] != last_analysis['total']:
+                    lines.append(f"    📥 BATTERY COUNT: {last_analysis['total']} → {analysis['total']}")
+            
+            text = "\n".join(lines)
+            # One print() per reading, so lines from concurrent chargers never
+            # interleave within a reading
+            console_text = text
+            if console_hidden:
+                console_text = "\n".join(line for i, line in enumerate(lines) if i not in console_hidden)
+            print(console_prefix + console_text.replace("\n", "\n" + console_prefix) if console_prefix else console_text)
+            # The log is only created once the charger has replied
+            log_file.write(text.encode() + b"\n", create=data is not None)
+            # Let the log buffer fill for up to a second; misdetections hit
+            # the disk right away and closing the file flushes the rest
+            now = loop.time()
+            if last_flush is None or now - last_flush >= _LOG_FLUSH_SECONDS or (analysis and analysis['misdetection_count']):
+                log_file.flush()
+                last_flush = now
+            # Poll at the minimum interval while readings change, and back
+            # off exponentially while they don't or the charger is down
+            if data is None:
+                failed_polls += 1
+                idle_polls = 0
+                interval = min(max_interval, max(min_interval, _FAILURE_BACKOFF * 2 ** (failed_polls - 1)))
+            elif data is last_data:
+                failed_polls = 0
+                idle_polls += 1
+                interval = min(max_interval, min_interval * _IDLE_BACKOFF ** idle_polls)
+            else:
+                failed_polls = 0
+                idle_polls = 0
+                interval = min_interval
+            
+            last_data = data
+            last_analysis = analysis
+            readings[base_url] = reading_num
+            reading_num += 1
+            
+            next_tick += interval
+            now = loop.time()
+            if next_tick < now:
+                # Fell behind (slow reply or timeout): skip the missed ticks
+                # rather than firing them back to back
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
 
 if __name__ == "__main__":
     main()